@@ -1,11 +1,24 @@
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from models import db, User, BMI, DietPlan, MedicalRecord
+from models import db, User, BMI, DietPlan, MedicalRecord, BMISummary
+from retention import run_retention
+from snapshot import database_snapshot
+from migrations import apply_migrations
+from diet_engine import plan_for_user
+from user_export import iter_user_export
+from rate_limit import rate_limited
+from csv_rotation import append_csv_row
+from export_data import export_tables
+from screening import (
+    CohortError, bmi_category, parse_cohort_csv, parse_cohort_json,
+    persist_screening, screen_cohort, screening_rows
+)
+from sqlalchemy import func, select, table, column, literal_column
+from sqlalchemy.exc import OperationalError
 import bcrypt
 import json
-import csv
 from datetime import datetime
 
 # Load environment variables
@@ -19,12 +32,12 @@ if not os.path.exists(os.path.join(os.path.dirname(__file__), 'instance')):
     os.makedirs(os.path.join(os.path.dirname(__file__), 'instance'))
 
 # Create exports directory if it doesn't exist
-export_dir = os.path.join(os.path.dirname(__file__), 'exports')
+export_dir = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'exports'))
 if not os.path.exists(export_dir):
     os.makedirs(export_dir)
 
-# Database configuration - use explicit path
-db_path = os.path.join(os.path.dirname(__file__), 'instance', 'diet_consultant.db')
+# Database configuration - use explicit path (DB_PATH overrides it, e.g. for tests)
+db_path = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), 'instance', 'diet_consultant.db'))
 print(f"Using database at: {db_path}")
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -37,98 +50,32 @@ with app.app_context():
     try:
         db.create_all()
         print("Database tables created successfully")
+        apply_migrations(db.engine)
     except Exception as e:
         print(f"Error creating database tables: {str(e)}")
 
 # Helper functions for CSV export
 def export_user_to_csv(user):
     """Append a user to the users CSV file"""
-    filename = os.path.join(export_dir, 'users.csv')
-    file_exists = os.path.isfile(filename)
-    
-    with open(filename, 'a', newline='') as csvfile:
-        fieldnames = ['id', 'name', 'email', 'created_at']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'created_at': user.created_at.isoformat()
-        })
+    append_csv_row(export_dir, 'users', User.csv_fieldnames, user.to_csv_row())
     
     print(f"Exported user {user.id} to CSV")
 
 def export_bmi_to_csv(bmi):
     """Append a BMI record to the CSV file"""
-    filename = os.path.join(export_dir, 'bmi_records.csv')
-    file_exists = os.path.isfile(filename)
-    
-    with open(filename, 'a', newline='') as csvfile:
-        fieldnames = ['id', 'user_id', 'height', 'weight', 'bmi', 'category', 'timestamp']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({
-            'id': bmi.id,
-            'user_id': bmi.user_id,
-            'height': bmi.height,
-            'weight': bmi.weight,
-            'bmi': bmi.bmi,
-            'category': bmi.category,
-            'timestamp': bmi.timestamp.isoformat()
-        })
+    append_csv_row(export_dir, 'bmi_records', BMI.csv_fieldnames, bmi.to_csv_row())
     
     print(f"Exported BMI record {bmi.id} to CSV")
 
 def export_diet_plan_to_csv(plan):
     """Append a diet plan to the CSV file"""
-    filename = os.path.join(export_dir, 'diet_plans.csv')
-    file_exists = os.path.isfile(filename)
-    
-    with open(filename, 'a', newline='') as csvfile:
-        fieldnames = ['id', 'user_id', 'bmi', 'plan', 'created_at']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({
-            'id': plan.id,
-            'user_id': plan.user_id,
-            'bmi': plan.bmi,
-            'plan': plan.plan,
-            'created_at': plan.created_at.isoformat()
-        })
+    append_csv_row(export_dir, 'diet_plans', DietPlan.csv_fieldnames, plan.to_csv_row())
     
     print(f"Exported diet plan {plan.id} to CSV")
 
 def export_medical_record_to_csv(record):
     """Append a medical record to the CSV file"""
-    filename = os.path.join(export_dir, 'medical_records.csv')
-    file_exists = os.path.isfile(filename)
-    
-    with open(filename, 'a', newline='') as csvfile:
-        fieldnames = ['id', 'user_id', 'date', 'bp', 'sugar', 'notes', 'created_at']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({
-            'id': record.id,
-            'user_id': record.user_id,
-            'date': record.date.isoformat(),
-            'bp': record.bp,
-            'sugar': record.sugar,
-            'notes': record.notes,
-            'created_at': record.created_at.isoformat()
-        })
+    append_csv_row(export_dir, 'medical_records', MedicalRecord.csv_fieldnames, record.to_csv_row())
     
     print(f"Exported medical record {record.id} to CSV")
 
@@ -138,8 +85,15 @@ def get_current_user_id():
     # In a real app, you would get this from the JWT token
     return 1
 
+def is_truthy(value):
+    """Read a boolean flag given as a JSON value or a query-string string"""
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes')
+
 # Authentication endpoints
 @app.route('/api/auth/signup', methods=['POST'])
+@rate_limited(cost=5, max_concurrent=4)
 def signup():
     try:
         data = request.get_json()
@@ -183,6 +137,7 @@ def signup():
         return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
+@rate_limited(cost=5, max_concurrent=4)
 def login():
     try:
         data = request.get_json()
@@ -228,14 +183,7 @@ def calculate_bmi():
     bmi = weight / ((height / 100) ** 2)
     
     # Determine BMI category
-    if bmi < 18.5:
-        category = "Underweight"
-    elif bmi < 25:
-        category = "Normal Weight"
-    elif bmi < 30:
-        category = "Overweight"
-    else:
-        category = "Obese"
+    category = bmi_category(bmi)
     
     # Store BMI in database
     new_bmi = BMI(
@@ -261,132 +209,87 @@ def calculate_bmi():
         'category': category
     }), 200
 
+@app.route('/api/bmi/screen', methods=['POST'])
+@rate_limited(cost=10, max_concurrent=2)
+def screen_bmi_cohort():
+    """Screen a batch of height/weight pairs uploaded as CSV or JSON.
+    
+    Accepts a CSV file upload (field 'file'), a text/csv body, or a JSON array
+    of {height, weight[, user_id]} objects. Pass persist=true (query string or
+    JSON) to store every row in the BMI table; this needs a user_id per row.
+    """
+    try:
+        persist = is_truthy(request.args.get('persist', 'false'))
+        
+        if 'file' in request.files:
+            try:
+                text = request.files['file'].read().decode('utf-8')
+            except UnicodeDecodeError:
+                raise CohortError('CSV file must be UTF-8 encoded')
+            cohort = parse_cohort_csv(text)
+        elif request.mimetype == 'text/csv':
+            try:
+                text = request.get_data().decode('utf-8')
+            except UnicodeDecodeError:
+                raise CohortError('CSV body must be UTF-8 encoded')
+            cohort = parse_cohort_csv(text)
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                persist = persist or is_truthy(data.get('persist', False))
+            cohort = parse_cohort_json(data)
+        
+        screening = screen_cohort(cohort['height'], cohort['weight'])
+        saved = persist_screening(cohort, screening, export_dir) if persist else 0
+    except CohortError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'count': len(screening['bmi']),
+        'distribution': screening['distribution'],
+        'saved': saved,
+        'results': screening_rows(cohort, screening)
+    }), 200
+
 # Diet plan endpoints
 @app.route('/api/diet-plan', methods=['GET'])
 def get_diet_plan():
     bmi = float(request.args.get('bmi', 0))
     
-    # Try to find an existing diet plan for this user and BMI
-    diet_plan = DietPlan.query.filter_by(
+    # Reuse the latest stored plan for this user and BMI unless the user's
+    # vitals have since changed what the plan should be
+    stored_plan = DietPlan.query.filter_by(
         user_id=get_current_user_id(),
         bmi=bmi
     ).order_by(DietPlan.created_at.desc()).first()
+    plan, is_new = plan_for_user(bmi, latest_medical_record(), stored_plan)
     
-    if diet_plan:
+    if is_new:
+        # Store the new plan
+        return save_diet_plan(bmi, plan)
+    else:
         # Return existing plan
-        plan_data = json.loads(diet_plan.plan)
         return jsonify({
             'success': True,
-            'dietPlan': plan_data
+            'dietPlan': plan
         }), 200
-    else:
-        # Generate a new plan
-        return generate_diet_plan_handler(bmi)
 
 @app.route('/api/diet-plan', methods=['POST'])
 def regenerate_diet_plan():
     data = request.get_json()
     bmi = float(data['bmi'])
     
-    return generate_diet_plan_handler(bmi)
-
-def generate_diet_plan_handler(bmi):
-    # Generate diet plan based on BMI
-    if bmi < 18.5:
-        # Underweight plan
-        plan = {
-            'breakfast': [
-                'Oatmeal with nuts and fruits',
-                'Whole grain toast with avocado and eggs',
-                'Protein smoothie with banana and peanut butter'
-            ],
-            'lunch': [
-                'Chicken or tofu wrap with vegetables',
-                'Quinoa salad with chickpeas and vegetables',
-                'Pasta with meat sauce and side salad'
-            ],
-            'dinner': [
-                'Salmon with sweet potato and vegetables',
-                'Lean steak with rice and vegetables',
-                'Chicken stir-fry with vegetables and rice'
-            ],
-            'snacks': [
-                'Greek yogurt with honey',
-                'Trail mix with nuts and dried fruits',
-                'Protein bar',
-                'Banana with peanut butter'
-            ],
-            'tips': [
-                'Eat larger portions to gain healthy weight',
-                'Focus on protein-rich foods to help build muscle',
-                'Include healthy fats like avocados, nuts, and olive oil',
-                'Try to eat more frequently throughout the day'
-            ]
-        }
-    elif bmi < 25:
-        # Normal weight plan
-        plan = {
-            'breakfast': [
-                'Greek yogurt with berries and granola',
-                'Whole grain toast with avocado and egg',
-                'Oatmeal with fruit and nuts'
-            ],
-            'lunch': [
-                'Grilled chicken salad with mixed greens',
-                'Turkey and vegetable wrap',
-                'Quinoa bowl with vegetables and lean protein'
-            ],
-            'dinner': [
-                'Baked fish with roasted vegetables',
-                'Stir-fried tofu with vegetables and brown rice',
-                'Lean meat with sweet potato and broccoli'
-            ],
-            'snacks': [
-                'Apple slices with almond butter',
-                'Carrot sticks with hummus',
-                'Greek yogurt',
-                'Handful of mixed nuts'
-            ],
-            'tips': [
-                'Maintain your balanced diet to stay in the healthy weight range',
-                'Stay hydrated with water throughout the day',
-                'Include a variety of fruits and vegetables for micronutrients',
-                'Moderate portion sizes to maintain your weight'
-            ]
-        }
-    else:
-        # Overweight/obese plan
-        plan = {
-            'breakfast': [
-                'Vegetable omelette with whole grain toast',
-                'Greek yogurt with berries',
-                'Overnight oats with chia seeds and fruit'
-            ],
-            'lunch': [
-                'Large salad with grilled chicken and light dressing',
-                'Vegetable soup with a side of lean protein',
-                'Lettuce wraps with lean ground turkey'
-            ],
-            'dinner': [
-                'Grilled fish with steamed vegetables',
-                'Baked chicken with roasted vegetables',
-                'Tofu and vegetable stir-fry with small portion of brown rice'
-            ],
-            'snacks': [
-                'Cucumber slices with hummus',
-                'Celery with small amount of nut butter',
-                'Small apple',
-                'Hard-boiled egg'
-            ],
-            'tips': [
-                'Focus on portion control to reduce calorie intake',
-                'Include plenty of vegetables to feel full with fewer calories',
-                'Choose lean proteins to support muscle maintenance',
-                'Stay hydrated as thirst can sometimes be mistaken for hunger',
-                'Reduce processed foods and added sugars'
-            ]
-        }
-    
+    plan, _ = plan_for_user(bmi, latest_medical_record())
+    return save_diet_plan(bmi, plan)
+
+def latest_medical_record():
+    """The current user's most recent medical record, if any"""
+    return MedicalRecord.query.filter_by(
+        user_id=get_current_user_id()
+    ).order_by(MedicalRecord.date.desc()).first()
+
+def save_diet_plan(bmi, plan):
     # Store in database
     new_plan = DietPlan(
         user_id=get_current_user_id(),
@@ -453,7 +356,144 @@ def get_users():
         'users': [user.to_dict() for user in users]
     }), 200
 
+@app.route('/api/admin/users/with-counts', methods=['GET'])
+@rate_limited(cost=3)
+def get_users_with_counts():
+    """List users with record counts and latest BMI in a single query"""
+    bmi_counts = db.session.query(
+        BMI.user_id, func.count(BMI.id).label('count')
+    ).group_by(BMI.user_id).subquery()
+    diet_plan_counts = db.session.query(
+        DietPlan.user_id, func.count(DietPlan.id).label('count')
+    ).group_by(DietPlan.user_id).subquery()
+    medical_record_counts = db.session.query(
+        MedicalRecord.user_id, func.count(MedicalRecord.id).label('count')
+    ).group_by(MedicalRecord.user_id).subquery()
+    
+    # Rank each user's BMI rows oldest first (id breaks timestamp ties) and
+    # keep the last one. Both windows share the ascending order of
+    # ix_bmi_user_id_timestamp, so no sort is needed; a descending window
+    # would make SQLite sort every row.
+    window = {
+        'partition_by': BMI.user_id,
+        'order_by': (BMI.timestamp, BMI.id)
+    }
+    ranked_bmis = db.session.query(
+        BMI.user_id,
+        BMI.bmi,
+        BMI.category,
+        BMI.timestamp,
+        func.row_number().over(**window).label('rank'),
+        func.count(BMI.id).over(rows=(None, None), **window).label('total')
+    ).subquery()
+    latest_bmi = db.session.query(ranked_bmis) \
+        .filter(ranked_bmis.c.rank == ranked_bmis.c.total).subquery()
+    
+    rows = db.session.query(
+        User,
+        func.coalesce(bmi_counts.c.count, 0),
+        func.coalesce(diet_plan_counts.c.count, 0),
+        func.coalesce(medical_record_counts.c.count, 0),
+        latest_bmi.c.bmi,
+        latest_bmi.c.category,
+        latest_bmi.c.timestamp
+    ).outerjoin(bmi_counts, bmi_counts.c.user_id == User.id) \
+     .outerjoin(diet_plan_counts, diet_plan_counts.c.user_id == User.id) \
+     .outerjoin(medical_record_counts, medical_record_counts.c.user_id == User.id) \
+     .outerjoin(latest_bmi, latest_bmi.c.user_id == User.id) \
+     .order_by(User.id).all()
+    
+    users = []
+    for user, bmi_count, diet_plan_count, medical_record_count, bmi, category, timestamp in rows:
+        user_data = user.to_dict()
+        user_data['counts'] = {
+            'bmi_records': bmi_count,
+            'diet_plans': diet_plan_count,
+            'medical_records': medical_record_count
+        }
+        user_data['latest_bmi'] = {
+            'bmi': bmi,
+            'category': category,
+            'timestamp': timestamp.isoformat()
+        } if bmi is not None else None
+        users.append(user_data)
+    
+    return jsonify({
+        'success': True,
+        'users': users
+    }), 200
+
+@app.route('/api/admin/users/<int:user_id>/overview', methods=['GET'])
+def get_user_overview(user_id):
+    """Profile, counts, latest BMI and recent history for one user.
+    
+    Runs a fixed number of queries regardless of how much history the user has:
+    one for the profile and counts, one per history table.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 5)), 1), 50)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    
+    counts = [
+        select(func.count(model.id)).where(model.user_id == User.id).scalar_subquery()
+        for model in (BMI, DietPlan, MedicalRecord)
+    ]
+    row = db.session.query(User, *counts).filter(User.id == user_id).first()
+    if not row:
+        return jsonify({'success': False, 'error': 'User not found'}), 404
+    user, bmi_count, diet_plan_count, medical_record_count = row
+    
+    # id breaks timestamp ties the same way as the users-with-counts listing
+    recent_bmis = BMI.query.filter_by(user_id=user_id) \
+        .order_by(BMI.timestamp.desc(), BMI.id.desc()).limit(limit).all()
+    recent_diet_plans = DietPlan.query.filter_by(user_id=user_id) \
+        .order_by(DietPlan.created_at.desc()).limit(limit).all()
+    recent_records = MedicalRecord.query.filter_by(user_id=user_id) \
+        .order_by(MedicalRecord.date.desc()).limit(limit).all()
+    
+    return jsonify({
+        'success': True,
+        'user': user.to_dict(),
+        'counts': {
+            'bmi_records': bmi_count,
+            'diet_plans': diet_plan_count,
+            'medical_records': medical_record_count
+        },
+        'latest_bmi': recent_bmis[0].to_dict() if recent_bmis else None,
+        'recent': {
+            'bmi_records': [record.to_dict() for record in recent_bmis],
+            'diet_plans': [
+                {
+                    'id': plan.id,
+                    'user_id': plan.user_id,
+                    'bmi': plan.bmi,
+                    'created_at': plan.created_at.isoformat(),
+                    'plan': json.loads(plan.plan)
+                }
+                for plan in recent_diet_plans
+            ],
+            'medical_records': [record.to_dict() for record in recent_records]
+        }
+    }), 200
+
+@app.route('/api/admin/users/<int:user_id>/export', methods=['GET'])
+@rate_limited(cost=10, max_concurrent=2)
+def export_user_data(user_id):
+    """Stream a zip of one user's profile, BMI history, diet plans and medical records"""
+    user = User.query.filter_by(id=user_id).first()
+    if not user:
+        return jsonify({'success': False, 'error': 'User not found'}), 404
+    
+    filename = f'user_{user_id}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+    return Response(
+        stream_with_context(iter_user_export(user)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 @app.route('/api/admin/bmi', methods=['GET'])
+@rate_limited(cost=5, max_concurrent=4)
 def get_bmi_records():
     user_id = request.args.get('user_id', 'all')
     
@@ -468,6 +508,7 @@ def get_bmi_records():
     }), 200
 
 @app.route('/api/admin/diet-plans', methods=['GET'])
+@rate_limited(cost=5, max_concurrent=4)
 def get_diet_plans():
     user_id = request.args.get('user_id', 'all')
     
@@ -491,6 +532,7 @@ def get_diet_plans():
     }), 200
 
 @app.route('/api/admin/medical-records', methods=['GET'])
+@rate_limited(cost=5, max_concurrent=4)
 def get_all_medical_records():
     user_id = request.args.get('user_id', 'all')
     
@@ -504,99 +546,166 @@ def get_all_medical_records():
         'records': [record.to_dict() for record in records]
     }), 200
 
+@app.route('/api/admin/medical-records/search', methods=['GET'])
+@rate_limited(cost=2)
+def search_medical_records():
+    """Ranked full-text search over medical record notes.
+    
+    q accepts FTS5 query syntax (e.g. insulin OR dizziness, "low sugar").
+    Optional filters: user_id, from and to (YYYY-MM-DD), page and per_page.
+    """
+    query_text = request.args.get('q', '').strip()
+    if not query_text:
+        return jsonify({'success': False, 'error': 'Missing search query'}), 400
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+        user_id = request.args.get('user_id', 'all')
+        user_id = None if user_id == 'all' else int(user_id)
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'page, per_page and user_id must be integers; from and to must be YYYY-MM-DD'
+        }), 400
+    
+    fts = table('medical_record_fts', column('rowid'), column('rank'), column('medical_record_fts'))
+    snippet = func.snippet(literal_column('medical_record_fts'), 0, '[', ']', '...', 12)
+    
+    search = db.session.query(MedicalRecord) \
+        .join(fts, fts.c.rowid == MedicalRecord.id) \
+        .filter(fts.c.medical_record_fts.op('MATCH')(query_text))
+    
+    if user_id is not None:
+        search = search.filter(MedicalRecord.user_id == user_id)
+    if date_from:
+        search = search.filter(MedicalRecord.date >= date_from)
+    if date_to:
+        search = search.filter(MedicalRecord.date <= date_to)
+    
+    try:
+        total = search.count()
+        rows = search.add_columns(fts.c.rank, snippet) \
+            .order_by(fts.c.rank) \
+            .limit(per_page).offset((page - 1) * per_page).all()
+    except OperationalError as e:
+        db.session.rollback()
+        print(f"Invalid search query {query_text!r}: {str(e)}")
+        return jsonify({'success': False, 'error': 'Invalid search query'}), 400
+    
+    results = []
+    for record, rank, match_snippet in rows:
+        result = record.to_dict()
+        result['rank'] = rank
+        result['snippet'] = match_snippet
+        results.append(result)
+    
+    return jsonify({
+        'success': True,
+        'query': query_text,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'records': results
+    }), 200
+
+@app.route('/api/admin/bmi/trends', methods=['GET'])
+@rate_limited(cost=3)
+def get_bmi_trends():
+    """Monthly BMI trend combining archived summaries with live rows"""
+    user_id = request.args.get('user_id', 'all')
+    # Written as a literal so it matches the ix_bmi_user_id_month expression
+    period = func.strftime(literal_column("'%Y-%m'"), BMI.timestamp)
+    
+    live_query = db.session.query(
+        BMI.user_id,
+        period,
+        func.count(BMI.id),
+        func.sum(BMI.bmi),
+        func.min(BMI.bmi),
+        func.max(BMI.bmi)
+    ).group_by(BMI.user_id, period)
+    summary_query = BMISummary.query
+    
+    if user_id != 'all':
+        live_query = live_query.filter(BMI.user_id == int(user_id))
+        summary_query = summary_query.filter_by(user_id=int(user_id))
+    
+    # Merge archived aggregates and live rows per (user, month)
+    trends = {}
+    rows = [
+        (s.user_id, s.period, s.count, s.bmi_sum, s.bmi_min, s.bmi_max)
+        for s in summary_query.all()
+    ] + live_query.all()
+    for uid, month, count, bmi_sum, bmi_min, bmi_max in rows:
+        entry = trends.setdefault((uid, month), {
+            'user_id': uid,
+            'period': month,
+            'count': 0,
+            'bmi_sum': 0.0,
+            'min_bmi': bmi_min,
+            'max_bmi': bmi_max
+        })
+        entry['count'] += count
+        entry['bmi_sum'] += bmi_sum
+        entry['min_bmi'] = min(entry['min_bmi'], bmi_min)
+        entry['max_bmi'] = max(entry['max_bmi'], bmi_max)
+    
+    result = []
+    for key in sorted(trends):
+        entry = trends[key]
+        entry['avg_bmi'] = entry.pop('bmi_sum') / entry['count']
+        result.append(entry)
+    
+    return jsonify({
+        'success': True,
+        'trends': result
+    }), 200
+
+# Retention endpoint for admin
+@app.route('/api/admin/retention/run', methods=['POST'])
+@rate_limited(cost=30, max_concurrent=1)
+def run_retention_now():
+    """Archive expired BMI and diet plan rows and refresh statistics"""
+    try:
+        data = request.get_json(silent=True) or {}
+        results = run_retention(vacuum=is_truthy(data.get('vacuum', False)))
+        return jsonify({
+            'success': True,
+            'archived': results
+        }), 200
+    except Exception as e:
+        print(f"Error running retention: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Error running retention: {str(e)}'
+        }), 500
+
 # Export data endpoint for admin
 @app.route('/api/admin/export-data', methods=['GET'])
+@rate_limited(cost=30, max_concurrent=1)
 def export_all_data():
-    """API endpoint to trigger a full data export"""
+    """API endpoint to trigger a full data export.
+    
+    Pass ?snapshot=true to export from a point-in-time copy made with the
+    SQLite online backup API instead of reading the live database.
+    """
     try:
-        # Export users
-        users_csv = os.path.join(export_dir, f'users_full_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
-        with app.app_context():
-            users = User.query.all()
-            
-            with open(users_csv, 'w', newline='') as csvfile:
-                fieldnames = ['id', 'name', 'email', 'created_at']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for user in users:
-                    writer.writerow({
-                        'id': user.id,
-                        'name': user.name,
-                        'email': user.email,
-                        'created_at': user.created_at.isoformat()
-                    })
+        use_snapshot = is_truthy(request.args.get('snapshot', 'false'))
         
-        # Export BMI records
-        bmi_csv = os.path.join(export_dir, f'bmi_full_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
-        with app.app_context():
-            records = BMI.query.all()
-            
-            with open(bmi_csv, 'w', newline='') as csvfile:
-                fieldnames = ['id', 'user_id', 'height', 'weight', 'bmi', 'category', 'timestamp']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for record in records:
-                    writer.writerow({
-                        'id': record.id,
-                        'user_id': record.user_id,
-                        'height': record.height,
-                        'weight': record.weight,
-                        'bmi': record.bmi,
-                        'category': record.category,
-                        'timestamp': record.timestamp.isoformat()
-                    })
-        
-        # Export diet plans
-        diet_csv = os.path.join(export_dir, f'diet_plans_full_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
-        with app.app_context():
-            plans = DietPlan.query.all()
-            
-            with open(diet_csv, 'w', newline='') as csvfile:
-                fieldnames = ['id', 'user_id', 'bmi', 'plan', 'created_at']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for plan in plans:
-                    writer.writerow({
-                        'id': plan.id,
-                        'user_id': plan.user_id,
-                        'bmi': plan.bmi,
-                        'plan': plan.plan,
-                        'created_at': plan.created_at.isoformat()
-                    })
-        
-        # Export medical records
-        medical_csv = os.path.join(export_dir, f'medical_records_full_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
-        with app.app_context():
-            records = MedicalRecord.query.all()
-            
-            with open(medical_csv, 'w', newline='') as csvfile:
-                fieldnames = ['id', 'user_id', 'date', 'bp', 'sugar', 'notes', 'created_at']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for record in records:
-                    writer.writerow({
-                        'id': record.id,
-                        'user_id': record.user_id,
-                        'date': record.date.isoformat(),
-                        'bp': record.bp,
-                        'sugar': record.sugar,
-                        'notes': record.notes,
-                        'created_at': record.created_at.isoformat()
-                    })
+        if use_snapshot:
+            with database_snapshot(db_path) as snapshot_app:
+                files = export_tables(snapshot_app, suffix='_full')
+        else:
+            files = export_tables(app, suffix='_full')
         
         return jsonify({
             'success': True,
             'message': 'All data exported successfully',
-            'files': {
-                'users': os.path.basename(users_csv),
-                'bmi_records': os.path.basename(bmi_csv),
-                'diet_plans': os.path.basename(diet_csv),
-                'medical_records': os.path.basename(medical_csv)
-            }
+            'snapshot': use_snapshot,
+            'files': {name: os.path.basename(path) for name, path in files.items()}
         }), 200
     except Exception as e:
         print(f"Error exporting data: {str(e)}")
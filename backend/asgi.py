@@ -0,0 +1,266 @@
+import os
+import json
+import math
+import asyncio
+from functools import partial, wraps
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request, jsonify
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app import app as flask_app, db_path, get_current_user_id, export_diet_plan_to_csv
+from models import User, BMI, DietPlan, MedicalRecord
+from diet_engine import plan_for_user
+from rate_limit import limiter
+
+# Async serving mode: the read-heavy routes below run as native coroutines on
+# an aiosqlite engine, everything else is passed through to the Flask app.
+# Serve with: uvicorn asgi:application
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '5'))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv('ASYNC_DB_MAX_OVERFLOW', '5'))
+ASYNC_CPU_WORKERS = int(os.getenv('ASYNC_CPU_WORKERS', '4'))
+# Threads serving the routes that fall through to the Flask app
+ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '16'))
+
+async_engine = create_async_engine(
+    f'sqlite+aiosqlite:///{db_path}',
+    pool_size=ASYNC_DB_POOL_SIZE,
+    max_overflow=ASYNC_DB_MAX_OVERFLOW
+)
+AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Plan generation, JSON decoding and CSV appends stay off the event loop
+executor = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix='async-cpu')
+
+async_app = Quart(__name__)
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run blocking or CPU-bound work in the executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+def async_rate_limited(cost=1, max_concurrent=None):
+    """Async counterpart of rate_limit.rate_limited sharing the same buckets"""
+    def decorator(view):
+        gate = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+        def rejection(status, error, retry_after):
+            return jsonify({'success': False, 'error': error}), status, {
+                'Retry-After': str(max(1, math.ceil(retry_after)))
+            }
+
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            # Check the gate before charging, so a 503 costs no tokens
+            if gate is not None and gate.locked():
+                return rejection(503, 'Server busy, please retry later', 1)
+
+            allowed, retry_after = limiter.take(request.remote_addr or 'unknown', cost)
+            if not allowed:
+                return rejection(429, 'Too many requests, please retry later', retry_after)
+
+            if gate is None:
+                return await view(*args, **kwargs)
+            async with gate:
+                return await view(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+@async_app.after_request
+async def add_cors_headers(response):
+    # Matches the permissive CORS(app) setup of the Flask app
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+    return response
+
+def install_wsgi_executor():
+    """Size the running loop's default executor, which serves fall-through WSGI requests"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASYNC_WSGI_THREADS, thread_name_prefix='async-wsgi')
+    )
+
+@async_app.before_serving
+async def startup():
+    install_wsgi_executor()
+
+@async_app.after_serving
+async def shutdown():
+    await async_engine.dispose()
+    executor.shutdown(wait=False)
+
+def serialize_diet_plans(plans):
+    return [
+        {
+            'id': plan.id,
+            'user_id': plan.user_id,
+            'bmi': plan.bmi,
+            'created_at': plan.created_at.isoformat(),
+            'plan': json.loads(plan.plan)
+        }
+        for plan in plans
+    ]
+
+# Diet plan endpoint
+@async_app.route('/api/diet-plan', methods=['GET'])
+async def get_diet_plan():
+    bmi = float(request.args.get('bmi', 0))
+    user_id = get_current_user_id()
+
+    async with AsyncSession() as session:
+        latest_record = (await session.execute(
+            select(MedicalRecord)
+            .filter_by(user_id=user_id)
+            .order_by(MedicalRecord.date.desc())
+            .limit(1)
+        )).scalar()
+
+        # Reuse the latest stored plan unless the vitals have changed it
+        stored_plan = (await session.execute(
+            select(DietPlan)
+            .filter_by(user_id=user_id, bmi=bmi)
+            .order_by(DietPlan.created_at.desc())
+            .limit(1)
+        )).scalar()
+        plan, is_new = await run_blocking(plan_for_user, bmi, latest_record, stored_plan)
+
+        if is_new:
+            new_plan = DietPlan(user_id=user_id, bmi=bmi, plan=json.dumps(plan))
+            session.add(new_plan)
+            await session.commit()
+
+            # Export diet plan to CSV
+            await run_blocking(export_diet_plan_to_csv, new_plan)
+
+    return jsonify({
+        'success': True,
+        'dietPlan': plan
+    }), 200
+
+# Medical record endpoint
+@async_app.route('/api/records', methods=['GET'])
+async def get_medical_records():
+    async with AsyncSession() as session:
+        records = (await session.execute(
+            select(MedicalRecord)
+            .filter_by(user_id=get_current_user_id())
+            .order_by(MedicalRecord.date.desc())
+        )).scalars().all()
+
+    return jsonify({
+        'success': True,
+        'records': [record.to_dict() for record in records]
+    }), 200
+
+# Admin API endpoints
+@async_app.route('/api/admin/users', methods=['GET'])
+async def get_users():
+    async with AsyncSession() as session:
+        users = (await session.execute(select(User))).scalars().all()
+
+    return jsonify({
+        'success': True,
+        'users': [user.to_dict() for user in users]
+    }), 200
+
+@async_app.route('/api/admin/bmi', methods=['GET'])
+@async_rate_limited(cost=5, max_concurrent=4)
+async def get_bmi_records():
+    user_id = request.args.get('user_id', 'all')
+    query = select(BMI).order_by(BMI.timestamp.desc())
+    if user_id != 'all':
+        query = query.filter_by(user_id=int(user_id))
+
+    async with AsyncSession() as session:
+        bmi_records = (await session.execute(query)).scalars().all()
+
+    return jsonify({
+        'success': True,
+        'bmi_records': [record.to_dict() for record in bmi_records]
+    }), 200
+
+@async_app.route('/api/admin/diet-plans', methods=['GET'])
+@async_rate_limited(cost=5, max_concurrent=4)
+async def get_diet_plans():
+    user_id = request.args.get('user_id', 'all')
+    query = select(DietPlan).order_by(DietPlan.created_at.desc())
+    if user_id != 'all':
+        query = query.filter_by(user_id=int(user_id))
+
+    async with AsyncSession() as session:
+        diet_plans = (await session.execute(query)).scalars().all()
+
+    return jsonify({
+        'success': True,
+        'diet_plans': await run_blocking(serialize_diet_plans, diet_plans)
+    }), 200
+
+@async_app.route('/api/admin/medical-records', methods=['GET'])
+@async_rate_limited(cost=5, max_concurrent=4)
+async def get_all_medical_records():
+    user_id = request.args.get('user_id', 'all')
+    query = select(MedicalRecord).order_by(MedicalRecord.date.desc())
+    if user_id != 'all':
+        query = query.filter_by(user_id=int(user_id))
+
+    async with AsyncSession() as session:
+        records = (await session.execute(query)).scalars().all()
+
+    return jsonify({
+        'success': True,
+        'records': [record.to_dict() for record in records]
+    }), 200
+
+# Requests for these (method, path) pairs go to the async app
+async_routes = {
+    (method, rule.rule)
+    for rule in async_app.url_map.iter_rules()
+    if rule.endpoint != 'static'
+    for method in rule.methods
+    if method not in ('HEAD', 'OPTIONS')
+}
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    """Runs the WSGI app on the default executor instead of one shared thread.
+
+    asgiref runs every request on a single thread_sensitive thread, which
+    would serve the fall-through routes one at a time.
+    """
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.serve_wsgi, thread_sensitive=False)(body)
+
+    def serve_wsgi(self, body):
+        """Run the Flask app on a pool thread and relay its response"""
+        environ = self.build_environ(self.scope, body)
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+        finally:
+            # Runs call_on_close hooks, e.g. releasing a rate_limited slot
+            if hasattr(response, 'close'):
+                response.close()
+
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+wsgi_application = ThreadPoolWsgiToAsgi(flask_app)
+
+async def application(scope, receive, send):
+    """ASGI entry point dispatching between the async routes and the Flask app"""
+    if scope['type'] == 'lifespan' or (
+        scope['type'] == 'http' and (scope['method'], scope['path']) in async_routes
+    ):
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmark against a scratch database, never the real one
+bench_dir = tempfile.mkdtemp(prefix='diet_consultant_bench_')
+os.environ['DB_PATH'] = os.path.join(bench_dir, 'diet_consultant.db')
+os.environ['EXPORT_DIR'] = os.path.join(bench_dir, 'exports')
+
+import numpy as np
+import httpx
+from sqlalchemy import event
+from app import app
+from models import db, User, BMI, DietPlan, MedicalRecord
+from rate_limit import limiter
+import asgi
+
+# Uncapped read routes, so the comparison is not dominated by 503s from admission control
+PATHS = ['/api/records', '/api/diet-plan?bmi=21.5']
+# Uncapped routes that async mode passes through to the Flask app
+FALL_THROUGH_PATHS = ['/api/admin/users/1/overview']
+
+class ConnectionTracker:
+    """Track how many pooled connections are checked out at once"""
+
+    def __init__(self, *pools):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        for pool in pools:
+            event.listen(pool, 'checkout', self.checkout)
+            event.listen(pool, 'checkin', self.checkin)
+
+    def checkout(self, *args):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def checkin(self, *args):
+        with self.lock:
+            self.current -= 1
+
+def seed(records=50):
+    with app.app_context():
+        db.session.add(User(id=1, name='bench', email='bench@example.com', password='x'))
+        start = datetime(2025, 1, 1)
+        for i in range(records):
+            db.session.add(BMI(user_id=1, height=170, weight=62, bmi=21.5, category='Normal Weight',
+                               timestamp=start + timedelta(hours=i)))
+            db.session.add(MedicalRecord(user_id=1, date=date(2024, 1, 1) + timedelta(days=i),
+                                         bp='120/80', sugar=95, notes=f'reading {i}'))
+        db.session.add(DietPlan(user_id=1, bmi=21.5, plan=json.dumps({'tips': ['Stay hydrated']})))
+        db.session.commit()
+
+def report(mode, concurrency, latencies, elapsed, errors, peak):
+    latencies = np.array(latencies) * 1000
+    print(f"{mode:11} c={concurrency:<4} {len(latencies) / elapsed:8.0f} req/s  "
+          f"p50 {np.percentile(latencies, 50):7.1f} ms  p99 {np.percentile(latencies, 99):7.1f} ms  "
+          f"peak connections {peak:3}  errors {errors}")
+
+def bench_sync(concurrency, requests, paths=PATHS, mode='sync'):
+    """Sync mode: one worker thread per in-flight request, as under a threaded WSGI server"""
+    with app.app_context():
+        tracker = ConnectionTracker(db.engine.pool)
+
+    def call(i):
+        start = time.perf_counter()
+        response = app.test_client().get(paths[i % len(paths)])
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    report(mode, concurrency, [r[0] for r in results], elapsed,
+           sum(1 for r in results if r[1] != 200), tracker.peak)
+
+async def bench_async(concurrency, requests, paths=PATHS, mode='async'):
+    """Async mode: all requests multiplexed on one event loop.
+
+    Fall-through paths run on the WSGI thread pool, so their connections come
+    from the Flask engine; both pools are tracked.
+    """
+    # As at server startup; the in-process client sends no lifespan events
+    asgi.install_wsgi_executor()
+    with app.app_context():
+        tracker = ConnectionTracker(asgi.async_engine.sync_engine.pool, db.engine.pool)
+    gate = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=asgi.application)
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def call(i):
+            async with gate:
+                start = time.perf_counter()
+                response = await client.get(paths[i % len(paths)])
+                return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(call(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    await asgi.async_engine.dispose()
+    report(mode, concurrency, [r[0] for r in results], elapsed,
+           sum(1 for r in results if r[1] != 200), tracker.peak)
+
+def run_benchmark(concurrency_levels=(8, 64, 256), requests=2000):
+    """Compare throughput and connections held between sync and async modes.
+
+    Both modes run in-process (Flask test client on a thread pool versus an
+    ASGI client on one event loop), so the numbers compare the serving models
+    rather than a particular web server. The fall-through rows check that
+    routes async mode hands to Flask still run concurrently.
+    """
+    seed()
+    # Measure serving capacity, not admission control
+    limiter.capacity = float('inf')
+
+    for concurrency in concurrency_levels:
+        bench_sync(concurrency, requests)
+        asyncio.run(bench_async(concurrency, requests))
+        bench_sync(concurrency, requests, FALL_THROUGH_PATHS, 'sync-wsgi')
+        asyncio.run(bench_async(concurrency, requests, FALL_THROUGH_PATHS, 'async-wsgi'))
+
+if __name__ == "__main__":
+    levels = tuple(int(c) for c in sys.argv[1:]) or (8, 64, 256)
+    run_benchmark(levels)
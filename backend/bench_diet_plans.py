@@ -0,0 +1,40 @@
+import time
+import numpy as np
+import diet_engine
+
+def measure(fn, repeat):
+    """Return (median, p99) latency of fn in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return np.median(samples), np.percentile(samples, 99)
+
+def run_benchmark(repeat=2000):
+    """Benchmark rule compilation and plan generation latency"""
+    start = time.perf_counter()
+    diet_engine.load_rules()
+    print(f"Load and compile rules: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    rng = np.random.default_rng(0)
+    bmis = rng.uniform(15, 40, repeat)
+    sugars = rng.uniform(50, 220, repeat)
+    pressures = [f'{s:.0f}/{d:.0f}' for s, d in zip(rng.uniform(80, 170, repeat), rng.uniform(50, 110, repeat))]
+    inputs = iter(zip(bmis.tolist(), sugars.tolist(), pressures))
+
+    def uncached():
+        diet_engine.plan_for_bucket.cache_clear()
+        diet_engine.generate_plan(*next(inputs))
+
+    median, p99 = measure(uncached, repeat)
+    print(f"Plan generation, cache miss: median {median:.1f} us, p99 {p99:.1f} us")
+
+    inputs = iter(zip(bmis.tolist(), sugars.tolist(), pressures))
+    diet_engine.generate_plan(22, 100, '120/80')
+    median, p99 = measure(lambda: diet_engine.generate_plan(*next(inputs)), repeat)
+    print(f"Plan generation, memoized: median {median:.1f} us, p99 {p99:.1f} us")
+    print(f"Distinct buckets cached: {diet_engine.plan_for_bucket.cache_info().currsize}")
+
+if __name__ == "__main__":
+    run_benchmark()
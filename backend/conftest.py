@@ -0,0 +1,41 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import event
+
+# Point the app at a throwaway database and export folder before it is imported
+test_dir = tempfile.mkdtemp(prefix='diet_consultant_test_')
+os.environ['DB_PATH'] = os.path.join(test_dir, 'diet_consultant.db')
+os.environ['EXPORT_DIR'] = os.path.join(test_dir, 'exports')
+
+from app import app as flask_app
+from models import db
+from migrations import apply_migrations
+from rate_limit import limiter, MemoryBackend
+
+@pytest.fixture
+def app():
+    # Every test starts with full rate limit buckets
+    limiter.backend = MemoryBackend()
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        apply_migrations(db.engine)
+        yield flask_app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def query_counter(app):
+    """Collect every (statement, parameters) pair sent to the database while the test runs"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,226 @@
+import io
+import os
+import csv
+import gzip
+import json
+import shutil
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The active segment of each CSV mirror is closed and compressed once it
+# reaches CSV_ROTATE_MAX_BYTES or has been open for CSV_ROTATE_MAX_AGE_SECONDS.
+CSV_ROTATE_MAX_BYTES = int(os.getenv('CSV_ROTATE_MAX_BYTES', str(10 * 1024 * 1024)))
+CSV_ROTATE_MAX_AGE_SECONDS = int(os.getenv('CSV_ROTATE_MAX_AGE_SECONDS', str(24 * 60 * 60)))
+
+# Appends and rotations of one mirror must not interleave. The thread lock
+# covers one process; the file lock in mirror_lock() covers other processes
+# (uvicorn workers, screening.py --persist) writing the same mirror.
+mirror_locks = defaultdict(threading.Lock)
+
+def active_path(export_dir, name):
+    return os.path.join(export_dir, f'{name}.csv')
+
+def manifest_path(export_dir, name):
+    return os.path.join(export_dir, f'{name}.manifest.json')
+
+def lock_path(export_dir, name):
+    return os.path.join(export_dir, f'{name}.lock')
+
+@contextmanager
+def mirror_lock(export_dir, name):
+    """Hold a mirror's lock against other threads and other processes"""
+    path = lock_path(export_dir, name)
+    with mirror_locks[path], open(path, 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def load_manifest(export_dir, name):
+    """Read a mirror's manifest, or start a fresh one.
+
+    segments lists closed, compressed segments with their id range, row count
+    and byte range [start_offset, end_offset) in the uncompressed stream of
+    all segments. active describes the file currently being appended to; a
+    stream offset maps to byte offset - start_offset within a segment's file.
+    """
+    path = manifest_path(export_dir, name)
+    if os.path.isfile(path):
+        with open(path) as f:
+            return json.load(f)
+    return {
+        'name': name,
+        'next_segment': 1,
+        'segments': [],
+        'active': {'file': f'{name}.csv', 'start_offset': 0, 'created_at': None}
+    }
+
+def save_manifest(export_dir, name, manifest):
+    """Replace the manifest atomically so readers never see a partial file"""
+    path = manifest_path(export_dir, name)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+def should_rotate(filename, manifest, now):
+    if os.path.getsize(filename) >= CSV_ROTATE_MAX_BYTES:
+        return True
+    created_at = manifest['active'].get('created_at')
+    if created_at is None:
+        return False
+    return (now - datetime.fromisoformat(created_at)).total_seconds() >= CSV_ROTATE_MAX_AGE_SECONDS
+
+def rotate(export_dir, name, manifest, now):
+    """Close the active segment: gzip it and record it in the manifest"""
+    segment_id = manifest['next_segment']
+    closed_file = os.path.join(export_dir, f'{name}.{segment_id:06d}.csv')
+    compressed_file = f'{closed_file}.gz'
+
+    # Move the segment aside first so new appends start a fresh active file
+    os.replace(active_path(export_dir, name), closed_file)
+
+    ids = []
+    with open(closed_file, newline='') as f:
+        for row in csv.DictReader(f):
+            ids.append(int(row['id']))
+    with open(closed_file, 'rb') as source, gzip.open(compressed_file, 'wb') as target:
+        shutil.copyfileobj(source, target)
+
+    size = os.path.getsize(closed_file)
+    start_offset = manifest['active']['start_offset']
+    manifest['segments'].append({
+        'segment': segment_id,
+        'file': os.path.basename(compressed_file),
+        'first_id': min(ids) if ids else None,
+        'last_id': max(ids) if ids else None,
+        'rows': len(ids),
+        'start_offset': start_offset,
+        'end_offset': start_offset + size,
+        'bytes': size,
+        'compressed_bytes': os.path.getsize(compressed_file),
+        'created_at': manifest['active'].get('created_at'),
+        'closed_at': now.isoformat()
+    })
+    manifest['next_segment'] = segment_id + 1
+    manifest['active'] = {'file': f'{name}.csv', 'start_offset': start_offset + size, 'created_at': None}
+    save_manifest(export_dir, name, manifest)
+    os.remove(closed_file)
+
+    print(f"Rotated {name}.csv into {os.path.basename(compressed_file)}")
+
+def append_csv_row(export_dir, name, fieldnames, row):
+    """Append one row to the active segment of a CSV mirror, rotating when due"""
+    append_csv_rows(export_dir, name, fieldnames, [row])
+
+def append_csv_rows(export_dir, name, fieldnames, rows):
+    """Append a batch of rows to the active segment in one write"""
+    filename = active_path(export_dir, name)
+    now = datetime.now()
+
+    with mirror_lock(export_dir, name):
+        manifest = load_manifest(export_dir, name)
+        if os.path.isfile(filename) and should_rotate(filename, manifest, now):
+            rotate(export_dir, name, manifest, now)
+
+        file_exists = os.path.isfile(filename)
+        with open(filename, 'a', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerows(rows)
+
+        if manifest['active'].get('created_at') is None:
+            manifest['active']['created_at'] = now.isoformat()
+            save_manifest(export_dir, name, manifest)
+
+def parse_rows(f, start):
+    """Parse the CSV rows of a segment file from local byte position start.
+
+    The header is always read from the top of the file; rows before start
+    (which tailers have already seen) are skipped without being parsed.
+    """
+    header = f.readline()
+    if start > len(header):
+        f.seek(start)
+    body = f.read()
+    fieldnames = next(csv.reader([header.decode('utf-8')]), [])
+    rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'), newline=''), fieldnames=fieldnames))
+    return rows, max(start, len(header)) + len(body)
+
+def read_rows_from(export_dir, name, offset=0):
+    """Return (rows, next_offset) for everything written after stream offset.
+
+    Tailers keep the returned offset and pass it to the next call. Closed
+    segments that end at or before the offset are skipped via the manifest,
+    and the active file is read from offset - active start_offset, so a call
+    only reads bytes the tailer has not seen.
+    """
+    with mirror_lock(export_dir, name):
+        manifest = load_manifest(export_dir, name)
+        # Open the active file under the lock so a rotation cannot swap it
+        # out between reading its size and reading its rows
+        try:
+            active_file = open(active_path(export_dir, name), 'rb')
+            active_size = os.fstat(active_file.fileno()).st_size
+        except FileNotFoundError:
+            active_file, active_size = None, 0
+
+    rows = []
+    next_offset = offset
+    try:
+        for segment in manifest['segments']:
+            if segment['end_offset'] <= offset:
+                continue
+            with gzip.open(os.path.join(export_dir, segment['file']), 'rb') as f:
+                segment_rows, _ = parse_rows(f, max(0, offset - segment['start_offset']))
+            rows += segment_rows
+            next_offset = segment['end_offset']
+
+        active_start = manifest['active']['start_offset']
+        if active_file is not None and active_start + active_size > offset:
+            # Only read up to the size seen under the lock: later appends
+            # may still be in progress
+            data = io.BytesIO(active_file.read(active_size))
+            active_rows, end = parse_rows(data, max(0, offset - active_start))
+            rows += active_rows
+            next_offset = active_start + end
+    finally:
+        if active_file is not None:
+            active_file.close()
+
+    return rows, next_offset
+
+def read_rows_after(export_dir, name, last_id=0):
+    """Yield rows with id > last_id, for consumers that track ids not offsets.
+
+    The manifest's id ranges give the offset of the first segment that can
+    hold newer rows; reading starts there.
+    """
+    manifest = load_manifest(export_dir, name)
+    offset = manifest['active']['start_offset']
+    for segment in manifest['segments']:
+        if segment['last_id'] is not None and segment['last_id'] > last_id:
+            offset = segment['start_offset']
+            break
+
+    rows, _ = read_rows_from(export_dir, name, offset)
+    for row in rows:
+        if int(row['id']) > last_id:
+            yield row
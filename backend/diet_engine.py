@@ -0,0 +1,152 @@
+import os
+import json
+from functools import lru_cache
+import numpy as np
+
+# Meals, rules and tips live in a data file so plans can be tuned without code
+# changes. It is read and compiled once, when this module is first imported.
+RULES_PATH = os.getenv('DIET_RULES_PATH', os.path.join(os.path.dirname(__file__), 'data', 'diet_rules.json'))
+
+# Weight used to push excluded meals out of contention
+EXCLUDED_SCORE = -np.inf
+
+def vitals_levels(rules):
+    """All (sugar, bp) level combinations the rules can be asked about"""
+    return [
+        (sugar, bp)
+        for sugar in rules['vitals']['sugar']['levels']
+        for bp in rules['vitals']['systolic']['levels']
+    ]
+
+def rule_matches(when, sugar, bp):
+    """Whether a rule's conditions hold for a vitals bucket"""
+    return when.get('sugar', sugar) == sugar and when.get('bp', bp) == bp
+
+def compile_rules(rules):
+    """Turn the rules file into lookup tables for vectorized scoring.
+
+    affinity[meal, band] is how well a meal suits a BMI band (0 = never).
+    tags[meal, tag] marks which tags each meal carries. For every vitals bucket,
+    tag_weights[bucket] adds to a tagged meal's score and tag_excluded[bucket]
+    removes tagged meals entirely.
+    """
+    bands = rules['bands']['names']
+    meals = rules['meals']
+    tag_names = sorted({tag for meal in meals for tag in meal['tags']} |
+                       {rule['tag'] for rule in rules['rules']})
+
+    affinity = np.array([[meal['bands'].get(band, 0.0) for band in bands] for meal in meals])
+    tags = np.array([[tag in meal['tags'] for tag in tag_names] for meal in meals], dtype=float)
+
+    tag_weights = {}
+    tag_excluded = {}
+    for sugar, bp in vitals_levels(rules):
+        weights = np.zeros(len(tag_names))
+        excluded = np.zeros(len(tag_names))
+        for rule in rules['rules']:
+            if rule_matches(rule['when'], sugar, bp):
+                index = tag_names.index(rule['tag'])
+                if rule.get('exclude'):
+                    excluded[index] = 1
+                else:
+                    weights[index] += rule['weight']
+        tag_weights[(sugar, bp)] = weights
+        tag_excluded[(sugar, bp)] = excluded
+
+    slots = list(rules['slots'])
+    meal_slots = np.array([slots.index(meal['slot']) for meal in meals])
+
+    return {
+        'bands': bands,
+        'band_thresholds': np.array(rules['bands']['thresholds']),
+        'vitals': {
+            name: {'levels': spec['levels'], 'thresholds': np.array(spec['thresholds'])}
+            for name, spec in rules['vitals'].items()
+        },
+        'slots': rules['slots'],
+        'slot_masks': {slot: meal_slots == i for i, slot in enumerate(slots)},
+        'meal_names': np.array([meal['name'] for meal in meals]),
+        'affinity': affinity,
+        'tags': tags,
+        'tag_weights': tag_weights,
+        'tag_excluded': tag_excluded,
+        'tips': rules['tips']
+    }
+
+def load_rules(path=RULES_PATH):
+    """Read and compile a rules file"""
+    with open(path) as f:
+        return compile_rules(json.load(f))
+
+engine = load_rules()
+
+def level_for(name, value):
+    """Bucket a vital reading into its named level"""
+    spec = engine['vitals'][name]
+    return spec['levels'][int(np.digitize(value, spec['thresholds']))]
+
+def bp_level(bp):
+    """Bucket a 'systolic/diastolic' reading; high wins over low"""
+    try:
+        systolic, diastolic = (float(part) for part in bp.split('/'))
+    except (AttributeError, ValueError):
+        return 'normal'
+
+    levels = {level_for('systolic', systolic), level_for('diastolic', diastolic)}
+    if 'high' in levels:
+        return 'high'
+    if 'low' in levels:
+        return 'low'
+    return 'normal'
+
+def sugar_level(sugar):
+    if sugar is None:
+        return 'normal'
+    return level_for('sugar', sugar)
+
+def band_for(bmi):
+    return engine['bands'][int(np.digitize(bmi, engine['band_thresholds']))]
+
+@lru_cache(maxsize=None)
+def plan_for_bucket(band, sugar, bp):
+    """Build the plan for one (BMI band, vitals bucket); memoized"""
+    band_index = engine['bands'].index(band)
+    affinity = engine['affinity'][:, band_index]
+
+    scores = affinity + engine['tags'] @ engine['tag_weights'][(sugar, bp)]
+    excluded = (engine['tags'] @ engine['tag_excluded'][(sugar, bp)] > 0) | (affinity <= 0)
+    scores = np.where(excluded, EXCLUDED_SCORE, scores)
+
+    plan = {}
+    for slot, count in engine['slots'].items():
+        slot_scores = np.where(engine['slot_masks'][slot], scores, EXCLUDED_SCORE)
+        # Stable sort keeps file order among equal scores
+        ranked = np.argsort(-slot_scores, kind='stable')[:count]
+        ranked = ranked[np.isfinite(slot_scores[ranked])]
+        plan[slot] = engine['meal_names'][ranked].tolist()
+
+    plan['tips'] = [
+        tip['text'] for tip in engine['tips']
+        if tip.get('band', band) == band and rule_matches(tip.get('when', {}), sugar, bp)
+    ]
+    return plan
+
+def generate_plan(bmi, sugar=None, bp=None):
+    """Diet plan for a BMI, personalized by the latest blood sugar and pressure"""
+    plan = plan_for_bucket(band_for(bmi), sugar_level(sugar), bp_level(bp))
+    return {key: list(items) for key, items in plan.items()}
+
+def plan_for_user(bmi, latest_record=None, stored_plan=None):
+    """Decide which plan to serve a user for a BMI.
+
+    latest_record is the user's most recent MedicalRecord and stored_plan
+    their latest stored DietPlan for this BMI (either may be None). Returns
+    (plan, is_new); is_new means there is no stored plan or the user's vitals
+    have since changed it, so the plan should be stored.
+    """
+    if latest_record:
+        plan = generate_plan(bmi, sugar=latest_record.sugar, bp=latest_record.bp)
+    else:
+        plan = generate_plan(bmi)
+    is_new = stored_plan is None or json.loads(stored_plan.plan) != plan
+    return plan, is_new
@@ -0,0 +1,109 @@
+import os
+import sys
+from flask import Flask
+from models import db
+
+# External-content FTS5 index over medical_record.notes; the triggers below
+# keep it in step with inserts, updates and deletes on the base table.
+MEDICAL_RECORD_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS medical_record_fts USING fts5(
+        notes,
+        content='medical_record',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+"""
+
+MEDICAL_RECORD_FTS_TRIGGERS = {
+    'medical_record_fts_ai': """
+        CREATE TRIGGER medical_record_fts_ai AFTER INSERT ON medical_record BEGIN
+            INSERT INTO medical_record_fts (rowid, notes) VALUES (new.id, new.notes);
+        END
+    """,
+    'medical_record_fts_ad': """
+        CREATE TRIGGER medical_record_fts_ad AFTER DELETE ON medical_record BEGIN
+            INSERT INTO medical_record_fts (medical_record_fts, rowid, notes)
+            VALUES ('delete', old.id, old.notes);
+        END
+    """,
+    'medical_record_fts_au': """
+        CREATE TRIGGER medical_record_fts_au AFTER UPDATE ON medical_record BEGIN
+            INSERT INTO medical_record_fts (medical_record_fts, rowid, notes)
+            VALUES ('delete', old.id, old.notes);
+            INSERT INTO medical_record_fts (rowid, notes) VALUES (new.id, new.notes);
+        END
+    """
+}
+
+def create_missing_indexes(engine):
+    """Create any index declared on the models that an existing database lacks.
+
+    db.create_all() only creates indexes together with new tables, so databases
+    created before an index was added need this to pick it up.
+    """
+    created = []
+    with engine.begin() as conn:
+        # Read names from sqlite_master: reflection skips expression indexes
+        existing = {
+            row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+
+    if created:
+        with engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        print(f"Created indexes: {', '.join(created)}")
+    return created
+
+def rebuild_medical_record_fts(engine):
+    """Re-index every medical record note from the base table"""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO medical_record_fts (medical_record_fts) VALUES ('rebuild')")
+    print("Rebuilt medical record full-text index")
+
+def ensure_medical_record_fts(engine):
+    """Create the notes search index and its sync triggers if missing.
+
+    When any trigger had to be (re)created the index may have missed writes,
+    so it is rebuilt from the base table.
+    """
+    with engine.begin() as conn:
+        conn.exec_driver_sql(MEDICAL_RECORD_FTS_TABLE)
+        existing = {
+            row[0] for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'medical_record'"
+            )
+        }
+        missing = [name for name in MEDICAL_RECORD_FTS_TRIGGERS if name not in existing]
+        for name in missing:
+            conn.exec_driver_sql(MEDICAL_RECORD_FTS_TRIGGERS[name])
+
+    if missing:
+        rebuild_medical_record_fts(engine)
+    return missing
+
+def apply_migrations(engine):
+    """Bring an existing database up to date with the models"""
+    return {
+        'indexes': create_missing_indexes(engine),
+        'fts_triggers': ensure_medical_record_fts(engine)
+    }
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    db_path = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), 'instance', 'diet_consultant.db'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        print(f"Migrations applied: {apply_migrations(db.engine)}")
+
+        # python migrations.py rebuild-fts re-indexes existing medical record notes
+        if 'rebuild-fts' in sys.argv[1:]:
+            rebuild_medical_record_fts(db.engine)
@@ -1,9 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import date, datetime
 
 db = SQLAlchemy()
 
-class User(db.Model):
+class CSVRowMixin:
+    """Row layout shared by the CSV mirrors, the full exports and per-user exports"""
+    csv_fieldnames = []
+
+    def to_csv_row(self):
+        row = {}
+        for name in self.csv_fieldnames:
+            value = getattr(self, name)
+            row[name] = value.isoformat() if isinstance(value, date) else value
+        return row
+
+class User(CSVRowMixin, db.Model):
+    csv_fieldnames = ['id', 'name', 'email', 'created_at']
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -22,7 +35,16 @@ class User(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
-class BMI(db.Model):
+class BMI(CSVRowMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_bmi_user_id_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_bmi_timestamp', 'timestamp'),
+        # Covers the monthly trend query, grouped in index order
+        db.Index('ix_bmi_user_id_month', 'user_id', db.text("strftime('%Y-%m', timestamp)"), 'bmi'),
+    )
+
+    csv_fieldnames = ['id', 'user_id', 'height', 'weight', 'bmi', 'category', 'timestamp']
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     height = db.Column(db.Float, nullable=False)  # in cm
@@ -42,7 +64,15 @@ class BMI(db.Model):
             'timestamp': self.timestamp.isoformat()
         }
 
-class DietPlan(db.Model):
+class DietPlan(CSVRowMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_diet_plan_user_id_bmi_created_at', 'user_id', 'bmi', 'created_at'),
+        db.Index('ix_diet_plan_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_diet_plan_created_at', 'created_at'),
+    )
+
+    csv_fieldnames = ['id', 'user_id', 'bmi', 'plan', 'created_at']
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     bmi = db.Column(db.Float, nullable=False)
@@ -58,7 +88,14 @@ class DietPlan(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
-class MedicalRecord(db.Model):
+class MedicalRecord(CSVRowMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_medical_record_user_id_date', 'user_id', 'date'),
+        db.Index('ix_medical_record_date', 'date'),
+    )
+
+    csv_fieldnames = ['id', 'user_id', 'date', 'bp', 'sugar', 'notes', 'created_at']
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -76,4 +113,26 @@ class MedicalRecord(db.Model):
             'bloodSugar': self.sugar,
             'notes': self.notes,
             'created_at': self.created_at.isoformat()
-        } 
\ No newline at end of file
+        }
+
+class BMISummary(db.Model):
+    """Monthly BMI aggregates kept after raw rows are archived by retention"""
+    __table_args__ = (db.UniqueConstraint('user_id', 'period'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    count = db.Column(db.Integer, nullable=False, default=0)
+    bmi_sum = db.Column(db.Float, nullable=False, default=0)
+    bmi_min = db.Column(db.Float, nullable=False)
+    bmi_max = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'period': self.period,
+            'count': self.count,
+            'avg_bmi': self.bmi_sum / self.count if self.count else None,
+            'min_bmi': self.bmi_min,
+            'max_bmi': self.bmi_max
+        }
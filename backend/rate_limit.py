@@ -0,0 +1,121 @@
+import os
+import math
+import time
+import threading
+from abc import ABC, abstractmethod
+from functools import wraps
+from flask import request, jsonify, make_response
+
+# Every client gets one bucket of RATE_LIMIT_CAPACITY tokens that refills at
+# RATE_LIMIT_REFILL_PER_SECOND; each limited route spends its own cost.
+RATE_LIMIT_CAPACITY = float(os.getenv('RATE_LIMIT_CAPACITY', '60'))
+RATE_LIMIT_REFILL_PER_SECOND = float(os.getenv('RATE_LIMIT_REFILL_PER_SECOND', '1'))
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets.
+
+    The in-memory backend only limits within one process. To share limits
+    across workers, subclass this and implement take() against a shared store
+    (e.g. a Redis script doing the same refill-then-spend arithmetic
+    atomically), then assign it to limiter.backend.
+    """
+
+    @abstractmethod
+    def take(self, key, cost, capacity, refill_rate, now):
+        """Spend cost tokens from key's bucket.
+
+        Returns (allowed, retry_after) where retry_after is the number of
+        seconds until the bucket will hold enough tokens.
+        """
+
+class MemoryBackend(RateLimitBackend):
+    """Process-local token buckets guarded by a lock"""
+
+    def __init__(self, max_keys=10000):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def take(self, key, cost, capacity, refill_rate, now):
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+            if tokens >= cost:
+                self.buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self.buckets[key] = (tokens, now)
+                allowed, retry_after = False, (cost - tokens) / refill_rate
+
+            if len(self.buckets) > self.max_keys:
+                self.prune(capacity, refill_rate, now)
+            return allowed, retry_after
+
+    def prune(self, capacity, refill_rate, now):
+        """Forget buckets that have refilled completely; they hold no state"""
+        for key, (tokens, updated) in list(self.buckets.items()):
+            if tokens + (now - updated) * refill_rate >= capacity:
+                del self.buckets[key]
+
+class TokenBucketLimiter:
+    """Per-client token bucket limiter over a pluggable backend"""
+
+    def __init__(self, backend=None, capacity=RATE_LIMIT_CAPACITY,
+                 refill_rate=RATE_LIMIT_REFILL_PER_SECOND, clock=time.monotonic):
+        self.backend = backend or MemoryBackend()
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.clock = clock
+
+    def take(self, key, cost):
+        return self.backend.take(key, cost, self.capacity, self.refill_rate, self.clock())
+
+limiter = TokenBucketLimiter()
+
+def client_key():
+    """Identify the caller; behind a proxy, configure ProxyFix so this is the real client"""
+    return request.remote_addr or 'unknown'
+
+def rejection(status, error, retry_after):
+    response = jsonify({'success': False, 'error': error})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def rate_limited(cost=1, max_concurrent=None):
+    """Charge cost tokens per request and cap in-flight requests for a view.
+
+    Clients over their budget get an immediate 429; when max_concurrent
+    requests are already running the view answers 503 instead of queueing,
+    so expensive routes cannot tie up every worker. Both carry Retry-After.
+    The concurrency gate is checked first, so a 503 costs no tokens.
+    """
+    def decorator(view):
+        gate = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if gate is not None and not gate.acquire(blocking=False):
+                return rejection(503, 'Server busy, please retry later', 1)
+
+            release_now = gate is not None
+            try:
+                allowed, retry_after = limiter.take(client_key(), cost)
+                if not allowed:
+                    return rejection(429, 'Too many requests, please retry later', retry_after)
+                if gate is None:
+                    return view(*args, **kwargs)
+
+                response = make_response(view(*args, **kwargs))
+                if response.is_streamed:
+                    # Hold the slot until the streamed body has been sent
+                    response.call_on_close(gate.release)
+                    release_now = False
+                return response
+            finally:
+                if release_now:
+                    gate.release()
+
+        return wrapper
+    return decorator
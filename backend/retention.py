@@ -0,0 +1,233 @@
+import os
+import csv
+import gzip
+import time
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import text, bindparam
+from models import db
+
+# Archive locations
+instance_dir = os.path.join(os.path.dirname(__file__), 'instance')
+archive_db_path = os.getenv('ARCHIVE_DB_PATH', os.path.join(instance_dir, 'diet_consultant_archive.db'))
+archive_file_dir = os.path.join(
+    os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'exports')), 'archive'
+)
+
+# Per-table retention policies. Rows older than max_age_days are moved out of
+# the live table in batches of batch_size, either into the attached archive
+# database ('database') or into gzip-compressed CSV files ('file').
+RETENTION_POLICIES = {
+    'bmi': {
+        'timestamp_column': 'timestamp',
+        'max_age_days': int(os.getenv('RETENTION_BMI_DAYS', '365')),
+        'batch_size': int(os.getenv('RETENTION_BATCH_SIZE', '500')),
+        'target': os.getenv('RETENTION_BMI_TARGET', 'database'),
+        'summarize': True
+    },
+    'diet_plan': {
+        'timestamp_column': 'created_at',
+        'max_age_days': int(os.getenv('RETENTION_DIET_PLAN_DAYS', '90')),
+        'batch_size': int(os.getenv('RETENTION_BATCH_SIZE', '500')),
+        'target': os.getenv('RETENTION_DIET_PLAN_TARGET', 'database'),
+        'summarize': False
+    }
+}
+
+# Maintenance schedule: ANALYZE after every run, VACUUM only every N runs and
+# only when enough of the file is free pages to be worth the rewrite.
+VACUUM_EVERY_RUNS = int(os.getenv('RETENTION_VACUUM_EVERY_RUNS', '24'))
+VACUUM_FREE_RATIO = float(os.getenv('RETENTION_VACUUM_FREE_RATIO', '0.2'))
+INCREMENTAL_VACUUM_PAGES = int(os.getenv('RETENTION_INCREMENTAL_VACUUM_PAGES', '1000'))
+
+# Selects the next batch of expired rows. The ids are fetched once and the
+# archive copy, the summary and the delete all use that same list.
+BATCH_IDS_SQL = (
+    "SELECT id FROM main.{table} WHERE {column} < :cutoff "
+    "ORDER BY {column}, id LIMIT :batch_size"
+)
+
+SUMMARIZE_BMI_SQL = """
+    INSERT INTO bmi_summary (user_id, period, count, bmi_sum, bmi_min, bmi_max)
+    SELECT user_id, strftime('%Y-%m', timestamp), COUNT(*), SUM(bmi), MIN(bmi), MAX(bmi)
+    FROM main.bmi WHERE id IN :ids
+    GROUP BY user_id, strftime('%Y-%m', timestamp)
+    ON CONFLICT (user_id, period) DO UPDATE SET
+        count = count + excluded.count,
+        bmi_sum = bmi_sum + excluded.bmi_sum,
+        bmi_min = MIN(bmi_min, excluded.bmi_min),
+        bmi_max = MAX(bmi_max, excluded.bmi_max)
+"""
+
+def cutoff_for(policy, now=None):
+    """Return the cutoff timestamp for a policy as stored by SQLAlchemy"""
+    now = now or datetime.utcnow()
+    return (now - timedelta(days=policy['max_age_days'])).isoformat(sep=' ')
+
+class BatchConflict(Exception):
+    """Raised when another run moved rows of a batch while it was being archived"""
+
+def by_ids(sql):
+    """A statement whose :ids parameter expands to a list of row ids"""
+    return text(sql).bindparams(bindparam('ids', expanding=True))
+
+def summarize_batch(conn, table, ids):
+    """Fold a batch of expired rows into the aggregate history tables"""
+    if table == 'bmi':
+        conn.execute(by_ids(SUMMARIZE_BMI_SQL), {'ids': ids})
+
+def archive_batch_to_database(conn, table, ids):
+    """Copy a batch into the attached archive database"""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0"
+    ))
+    result = conn.execute(by_ids(
+        f"INSERT INTO archive.{table} SELECT * FROM main.{table} WHERE id IN :ids"
+    ), {'ids': ids})
+    return result.rowcount
+
+def archive_batch_to_file(conn, table, ids):
+    """Write a batch to a gzip-compressed CSV file under exports/archive.
+
+    The file is written under a .tmp name and returned alongside the row
+    count; archive_table renames it only once the batch's DELETE has
+    committed, so a failed transaction never leaves a duplicate archive.
+    """
+    result = conn.execute(by_ids(
+        f"SELECT * FROM main.{table} WHERE id IN :ids ORDER BY id"
+    ), {'ids': ids})
+    fieldnames = list(result.keys())
+    rows = result.fetchall()
+    if not rows:
+        return 0, None
+
+    if not os.path.exists(archive_file_dir):
+        os.makedirs(archive_file_dir)
+
+    filename = os.path.join(
+        archive_file_dir,
+        f'{table}_{rows[0].id}-{rows[-1].id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv.gz.tmp'
+    )
+    with gzip.open(filename, 'wt', newline='') as archive_file:
+        writer = csv.writer(archive_file)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+
+    return len(rows), filename
+
+def archive_table(table, policy, now=None):
+    """Move expired rows of one table out of the live database in batches"""
+    column = policy['timestamp_column']
+    batch_sql = text(BATCH_IDS_SQL.format(table=table, column=column))
+    params = {'cutoff': cutoff_for(policy, now), 'batch_size': policy['batch_size']}
+    moved = 0
+
+    with db.engine.connect() as conn:
+        if policy['target'] == 'database':
+            conn.exec_driver_sql('ATTACH DATABASE ? AS archive', (archive_db_path,))
+            conn.commit()
+        try:
+            while True:
+                pending_file = None
+                try:
+                    # One short transaction per batch so writers are never blocked for long
+                    with conn.begin():
+                        ids = conn.execute(batch_sql, params).scalars().all()
+                        if not ids:
+                            break
+
+                        if policy['target'] == 'database':
+                            count = archive_batch_to_database(conn, table, ids)
+                        else:
+                            count, pending_file = archive_batch_to_file(conn, table, ids)
+
+                        if policy.get('summarize'):
+                            summarize_batch(conn, table, ids)
+                        deleted = conn.execute(
+                            by_ids(f"DELETE FROM main.{table} WHERE id IN :ids"), {'ids': ids}
+                        ).rowcount
+
+                        # The SELECT does not open the SQLite transaction, so an
+                        # overlapping run may have moved some of these rows first
+                        if count != len(ids) or deleted != len(ids):
+                            raise BatchConflict(f'{table} batch {ids[0]}-{ids[-1]} changed while archiving')
+                except BatchConflict as e:
+                    # Rolled back; the next batch is selected afresh
+                    print(f"Retrying: {str(e)}")
+                    if pending_file:
+                        os.remove(pending_file)
+                    continue
+                except Exception:
+                    # The rows are still live; drop the copy so the retry writes a fresh one
+                    if pending_file:
+                        os.remove(pending_file)
+                    raise
+
+                if pending_file:
+                    os.replace(pending_file, pending_file[:-len('.tmp')])
+                moved += count
+                if len(ids) < policy['batch_size']:
+                    break
+        finally:
+            if policy['target'] == 'database':
+                conn.exec_driver_sql('DETACH DATABASE archive')
+
+    print(f"Archived {moved} rows from {table}")
+    return moved
+
+def run_maintenance(vacuum=False):
+    """Refresh planner statistics and reclaim free pages"""
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        conn.exec_driver_sql('ANALYZE')
+
+        auto_vacuum = conn.exec_driver_sql('PRAGMA auto_vacuum').scalar()
+        if auto_vacuum == 2:
+            # Incremental mode frees pages in small steps without rewriting the file
+            conn.exec_driver_sql(f'PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES})')
+        elif vacuum:
+            page_count = conn.exec_driver_sql('PRAGMA page_count').scalar()
+            freelist_count = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+            if page_count and freelist_count / page_count >= VACUUM_FREE_RATIO:
+                conn.exec_driver_sql('VACUUM')
+                print(f"Vacuumed database ({freelist_count} of {page_count} pages free)")
+
+def run_retention(policies=None, vacuum=False, now=None):
+    """Apply every retention policy, then run database maintenance"""
+    policies = policies or RETENTION_POLICIES
+    results = {}
+    for table, policy in policies.items():
+        results[table] = archive_table(table, policy, now)
+
+    run_maintenance(vacuum=vacuum)
+    return results
+
+def main():
+    from flask import Flask
+
+    parser = argparse.ArgumentParser(description='Archive old BMI and diet plan rows')
+    parser.add_argument('--loop', action='store_true', help='keep running on a schedule')
+    parser.add_argument('--interval', type=int, default=3600, help='seconds between runs')
+    parser.add_argument('--vacuum', action='store_true', help='allow VACUUM on this run')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    db_path = os.getenv('DB_PATH', os.path.join(instance_dir, 'diet_consultant.db'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        runs = 0
+        while True:
+            runs += 1
+            vacuum = args.vacuum or (args.loop and runs % VACUUM_EVERY_RUNS == 0)
+            results = run_retention(vacuum=vacuum)
+            print(f"Retention run {runs} completed: {results}")
+            if not args.loop:
+                break
+            time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
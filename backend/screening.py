@@ -0,0 +1,203 @@
+import os
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert, select
+from models import db, User, BMI
+from csv_rotation import append_csv_rows
+
+# A BMI at or above each threshold moves up one category
+BMI_THRESHOLDS = np.array([18.5, 25.0, 30.0])
+BMI_CATEGORIES = np.array(['Underweight', 'Normal Weight', 'Overweight', 'Obese'])
+
+class CohortError(ValueError):
+    """Raised when an uploaded cohort cannot be screened"""
+
+def bmi_category(bmi):
+    """Return the category name for a single BMI value"""
+    return str(BMI_CATEGORIES[np.digitize(bmi, BMI_THRESHOLDS)])
+
+def parse_cohort_csv(text):
+    """Read height/weight (and optional user_id) columns from CSV text"""
+    rows = csv.reader(io.StringIO(text))
+    header = [name.strip().lower() for name in next(rows, [])]
+    if 'height' not in header or 'weight' not in header:
+        raise CohortError('CSV must have height and weight columns')
+
+    data_rows = []
+    for row in rows:
+        if not row:
+            continue
+        if len(row) != len(header):
+            raise CohortError(f'Line {rows.line_num} has {len(row)} values, expected {len(header)}')
+        data_rows.append(row)
+
+    columns = list(zip(*data_rows))
+    if not columns:
+        raise CohortError('No rows to screen')
+
+    cohort = {
+        'height': columns[header.index('height')],
+        'weight': columns[header.index('weight')]
+    }
+    if 'user_id' in header:
+        cohort['user_id'] = columns[header.index('user_id')]
+    return to_arrays(cohort)
+
+def parse_cohort_json(data):
+    """Read a JSON array of {height, weight[, user_id]} objects"""
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list) or not data:
+        raise CohortError('Expected a non-empty array of rows')
+
+    try:
+        cohort = {
+            'height': [row['height'] for row in data],
+            'weight': [row['weight'] for row in data]
+        }
+    except (KeyError, TypeError):
+        raise CohortError('Every row needs height and weight')
+    if all('user_id' in row for row in data):
+        cohort['user_id'] = [row['user_id'] for row in data]
+    return to_arrays(cohort)
+
+def to_arrays(cohort):
+    """Convert parsed columns to NumPy arrays, rejecting non-numeric values"""
+    try:
+        arrays = {
+            'height': np.asarray(cohort['height'], dtype=float),
+            'weight': np.asarray(cohort['weight'], dtype=float)
+        }
+        if 'user_id' in cohort:
+            arrays['user_id'] = np.asarray(cohort['user_id'], dtype=np.int64)
+    except (TypeError, ValueError):
+        raise CohortError('Height, weight and user_id must be numeric')
+    return arrays
+
+def screen_cohort(heights, weights):
+    """Compute BMI and category for every row at once.
+
+    heights are in cm and weights in kg. Returns the BMI array, the index of
+    each row's category in BMI_CATEGORIES and the category distribution.
+    """
+    invalid = ~(np.isfinite(heights) & np.isfinite(weights) & (heights > 0) & (weights > 0))
+    if invalid.any():
+        rows = (np.flatnonzero(invalid)[:10] + 1).tolist()
+        raise CohortError(f'Height and weight must be positive numbers (rows {rows})')
+
+    bmi = weights / np.square(heights / 100)
+    category_index = np.digitize(bmi, BMI_THRESHOLDS)
+    counts = np.bincount(category_index, minlength=len(BMI_CATEGORIES))
+
+    return {
+        'bmi': bmi,
+        'category_index': category_index,
+        'distribution': dict(zip(BMI_CATEGORIES.tolist(), counts.tolist()))
+    }
+
+def screening_rows(cohort, screening):
+    """Per-row results as plain dicts"""
+    categories = BMI_CATEGORIES[screening['category_index']].tolist()
+    return [
+        {'height': height, 'weight': weight, 'bmi': bmi, 'category': category}
+        for height, weight, bmi, category in zip(
+            cohort['height'].tolist(),
+            cohort['weight'].tolist(),
+            screening['bmi'].tolist(),
+            categories
+        )
+    ]
+
+def persist_screening(cohort, screening, export_dir):
+    """Store every screened row in the BMI table with one bulk insert.
+
+    The saved rows are then appended to the bmi_records CSV mirror in one
+    batched write, so the mirror keeps every id the table has.
+    """
+    if 'user_id' not in cohort:
+        raise CohortError('A user_id for every row is required to save results')
+
+    # Foreign keys are not enforced, so reject unknown users before inserting
+    user_ids = set(cohort['user_id'].tolist())
+    known = set(db.session.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+    unknown = sorted(user_ids - known)
+    if unknown:
+        raise CohortError(f'Unknown user_id values: {unknown[:10]}')
+
+    timestamp = datetime.utcnow()
+    categories = BMI_CATEGORIES[screening['category_index']].tolist()
+    rows = [
+        {'user_id': user_id, 'height': height, 'weight': weight, 'bmi': bmi,
+         'category': category, 'timestamp': timestamp}
+        for user_id, height, weight, bmi, category in zip(
+            cohort['user_id'].tolist(),
+            cohort['height'].tolist(),
+            cohort['weight'].tolist(),
+            screening['bmi'].tolist(),
+            categories
+        )
+    ]
+    result = db.session.execute(insert(BMI).returning(BMI.id), rows)
+    # Rows inserted in one transaction get ascending ids in insertion order
+    ids = sorted(result.scalars().all())
+    db.session.commit()
+
+    append_csv_rows(export_dir, 'bmi_records', BMI.csv_fieldnames, [
+        BMI(id=row_id, **row).to_csv_row()
+        for row_id, row in zip(ids, rows)
+    ])
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Screen a cohort of height/weight pairs for BMI')
+    parser.add_argument('path', help='CSV or JSON file with height and weight columns')
+    parser.add_argument('--output', help='write per-row results to this CSV file')
+    parser.add_argument('--persist', action='store_true', help='save results to the BMI table')
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        if args.path.endswith('.json'):
+            cohort = parse_cohort_json(json.load(f))
+        else:
+            cohort = parse_cohort_csv(f.read())
+
+    start = time.perf_counter()
+    screening = screen_cohort(cohort['height'], cohort['weight'])
+    elapsed = time.perf_counter() - start
+
+    print(f"Screened {len(screening['bmi'])} rows in {elapsed * 1000:.1f} ms")
+    for category, count in screening['distribution'].items():
+        print(f"{category}: {count}")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=['height', 'weight', 'bmi', 'category'])
+            writer.writeheader()
+            writer.writerows(screening_rows(cohort, screening))
+        print(f"Results written to {args.output}")
+
+    if args.persist:
+        from flask import Flask
+
+        app = Flask(__name__)
+        db_path = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), 'instance', 'diet_consultant.db'))
+        export_dir = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'exports'))
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():
+            print(f"Saved {persist_screening(cohort, screening, export_dir)} BMI records")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except CohortError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
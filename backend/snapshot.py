@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from flask import Flask
+from models import db
+
+# Copy this many pages per backup step, sleeping in between so writers on the
+# live database only ever wait for one short step.
+SNAPSHOT_PAGES_PER_STEP = int(os.getenv('SNAPSHOT_PAGES_PER_STEP', '256'))
+SNAPSHOT_STEP_SLEEP = float(os.getenv('SNAPSHOT_STEP_SLEEP', '0.005'))
+
+def backup_database(source_path, target_path, pages=None, sleep=None):
+    """Copy a SQLite database with the online backup API in incremental steps"""
+    pages = pages or SNAPSHOT_PAGES_PER_STEP
+    sleep = SNAPSHOT_STEP_SLEEP if sleep is None else sleep
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=pages, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+
+@contextmanager
+def database_snapshot(source_path):
+    """Yield a Flask app bound to a point-in-time copy of the database.
+
+    Queries made inside ``snapshot_app.app_context()`` read the copy, so a
+    multi-table export sees one consistent state and never holds locks on
+    the live database. The copy is deleted on exit.
+    """
+    fd, snapshot_path = tempfile.mkstemp(prefix='diet_consultant_snapshot_', suffix='.db')
+    os.close(fd)
+    snapshot_app = None
+    try:
+        backup_database(source_path, snapshot_path)
+        print(f"Created database snapshot at: {snapshot_path}")
+
+        snapshot_app = Flask(__name__)
+        snapshot_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{snapshot_path}'
+        snapshot_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(snapshot_app)
+
+        yield snapshot_app
+    finally:
+        if snapshot_app is not None:
+            with snapshot_app.app_context():
+                db.engine.dispose()
+        os.remove(snapshot_path)
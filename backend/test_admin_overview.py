@@ -0,0 +1,104 @@
+import json
+from datetime import date, datetime, timedelta
+from models import db, User, BMI, DietPlan, MedicalRecord
+
+def create_user_with_history(name, records):
+    user = User(name=name, email=f'{name}@example.com', password='x')
+    db.session.add(user)
+    db.session.flush()
+
+    start = datetime(2025, 1, 1)
+    for i in range(records):
+        db.session.add(BMI(user_id=user.id, height=170, weight=60 + i, bmi=20 + i,
+                           category='Normal Weight', timestamp=start + timedelta(days=i)))
+        db.session.add(DietPlan(user_id=user.id, bmi=20 + i, plan=json.dumps({'tips': []}),
+                                created_at=start + timedelta(days=i)))
+        db.session.add(MedicalRecord(user_id=user.id, date=date(2025, 1, 1) + timedelta(days=i),
+                                     bp='120/80', sugar=90, notes=''))
+    db.session.commit()
+    return user.id
+
+def test_user_overview(client):
+    user_id = create_user_with_history('awais', 8)
+
+    data = client.get(f'/api/admin/users/{user_id}/overview?limit=3').get_json()
+
+    assert data['success']
+    assert data['user']['name'] == 'awais'
+    assert data['counts'] == {'bmi_records': 8, 'diet_plans': 8, 'medical_records': 8}
+    assert data['latest_bmi']['bmi'] == 27
+    assert [r['bmi'] for r in data['recent']['bmi_records']] == [27, 26, 25]
+    assert len(data['recent']['diet_plans']) == 3
+    assert data['recent']['medical_records'][0]['date'] == '2025-01-08'
+
+def test_user_overview_missing_user(client):
+    response = client.get('/api/admin/users/999/overview')
+    assert response.status_code == 404
+
+def test_user_overview_query_count_is_fixed(client, query_counter):
+    small_user = create_user_with_history('small', 1)
+    large_user = create_user_with_history('large', 40)
+
+    query_counter.clear()
+    client.get(f'/api/admin/users/{small_user}/overview')
+    small_queries = len(query_counter)
+
+    query_counter.clear()
+    client.get(f'/api/admin/users/{large_user}/overview')
+    assert len(query_counter) == small_queries == 4
+
+def test_users_with_counts_single_query(client, query_counter):
+    for i in range(5):
+        create_user_with_history(f'user{i}', i)
+
+    query_counter.clear()
+    data = client.get('/api/admin/users/with-counts').get_json()
+
+    assert len(query_counter) == 1
+    assert [u['counts']['bmi_records'] for u in data['users']] == [0, 1, 2, 3, 4]
+    assert data['users'][0]['latest_bmi'] is None
+    assert data['users'][4]['latest_bmi']['bmi'] == 23
+
+def test_user_overview_limit_is_clamped(client):
+    user_id = create_user_with_history('clamped', 60)
+
+    data = client.get(f'/api/admin/users/{user_id}/overview?limit=-1').get_json()
+    assert len(data['recent']['bmi_records']) == 1
+
+    data = client.get(f'/api/admin/users/{user_id}/overview?limit=500').get_json()
+    assert len(data['recent']['bmi_records']) == 50
+
+    assert client.get(f'/api/admin/users/{user_id}/overview?limit=abc').status_code == 400
+
+def test_users_with_counts_latest_bmi_breaks_timestamp_ties_by_id(client):
+    user = User(name='tied', email='tied@example.com', password='x')
+    db.session.add(user)
+    db.session.flush()
+    timestamp = datetime(2025, 3, 1, 8, 0)
+    for bmi in (21, 23, 22):
+        db.session.add(BMI(user_id=user.id, height=170, weight=60, bmi=bmi,
+                           category='Normal Weight', timestamp=timestamp))
+    db.session.add(BMI(user_id=user.id, height=170, weight=60, bmi=30,
+                       category='Obese', timestamp=timestamp - timedelta(days=1)))
+    db.session.commit()
+
+    data = client.get('/api/admin/users/with-counts').get_json()
+
+    assert data['users'][0]['counts']['bmi_records'] == 4
+    assert data['users'][0]['latest_bmi']['bmi'] == 22
+
+def test_overview_and_listing_agree_on_tied_latest_bmi(client):
+    user = User(name='tied', email='tied@example.com', password='x')
+    db.session.add(user)
+    db.session.flush()
+    timestamp = datetime(2025, 3, 1, 8, 0)
+    for bmi in (21, 23, 22):
+        db.session.add(BMI(user_id=user.id, height=170, weight=60, bmi=bmi,
+                           category='Normal Weight', timestamp=timestamp))
+    db.session.commit()
+
+    overview = client.get(f'/api/admin/users/{user.id}/overview').get_json()
+    listing = client.get('/api/admin/users/with-counts').get_json()
+
+    assert overview['latest_bmi']['bmi'] == listing['users'][0]['latest_bmi']['bmi'] == 22
+    assert [r['bmi'] for r in overview['recent']['bmi_records']] == [22, 23, 21]
@@ -0,0 +1,99 @@
+import json
+import time
+import asyncio
+import threading
+import pytest
+from datetime import date, datetime, timedelta
+from models import db, User, BMI, DietPlan, MedicalRecord
+
+pytest.importorskip('quart')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+httpx = pytest.importorskip('httpx')
+
+PARITY_ENDPOINTS = [
+    '/api/records',
+    '/api/diet-plan?bmi=21.5',
+    '/api/admin/users',
+    '/api/admin/bmi',
+    '/api/admin/bmi?user_id=1',
+    '/api/admin/diet-plans',
+    '/api/admin/medical-records?user_id=1',
+]
+
+def fetch_async(*paths):
+    import asgi
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=asgi.application)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return [await client.get(path) for path in paths]
+        finally:
+            # Pooled aiosqlite connections are bound to this event loop
+            await asgi.async_engine.dispose()
+
+    return asyncio.run(fetch())
+
+@pytest.fixture
+def seeded(app):
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    start = datetime(2025, 1, 1)
+    for i in range(5):
+        db.session.add(BMI(user_id=1, height=170, weight=62, bmi=21.5, category='Normal Weight',
+                           timestamp=start + timedelta(days=i)))
+        db.session.add(MedicalRecord(user_id=1, date=date(2025, 1, 1) + timedelta(days=i),
+                                     bp='120/80', sugar=90, notes=f'note {i}', created_at=start))
+    db.session.add(DietPlan(user_id=1, bmi=21.5, plan=json.dumps({'tips': ['x']}), created_at=start))
+    db.session.commit()
+
+@pytest.mark.parametrize('path', PARITY_ENDPOINTS)
+def test_async_routes_match_sync_routes(client, seeded, path):
+    [async_response] = fetch_async(path)
+    assert async_response.status_code == 200
+    assert async_response.headers['Access-Control-Allow-Origin'] == '*'
+    assert async_response.json() == client.get(path).get_json()
+
+def test_async_diet_plan_generates_and_stores_plan(seeded):
+    [response] = fetch_async('/api/diet-plan?bmi=17')
+    assert response.json()['dietPlan']['snacks'][0] == 'Greek yogurt with honey'
+    assert DietPlan.query.filter_by(bmi=17).count() == 1
+
+def test_async_diet_plan_follows_new_vitals(seeded):
+    [before] = fetch_async('/api/diet-plan?bmi=17')
+    db.session.add(MedicalRecord(user_id=1, date=date(2025, 3, 1), bp='120/80', sugar=200))
+    db.session.commit()
+    [after] = fetch_async('/api/diet-plan?bmi=17')
+
+    assert 'Greek yogurt with honey' in before.json()['dietPlan']['snacks']
+    assert 'Greek yogurt with honey' not in after.json()['dietPlan']['snacks']
+    assert DietPlan.query.filter_by(bmi=17).count() == 2
+
+def test_other_routes_fall_through_to_flask(seeded):
+    [overview, missing] = fetch_async('/api/admin/users/1/overview', '/api/admin/users/9/overview')
+    assert overview.json()['counts']['bmi_records'] == 5
+    assert missing.status_code == 404
+
+def test_fall_through_requests_run_concurrently(seeded, monkeypatch):
+    import asgi
+    threads = set()
+
+    def slow_overview(user_id):
+        threads.add(threading.get_ident())
+        time.sleep(0.3)
+        return {'success': True}
+
+    monkeypatch.setitem(asgi.flask_app.view_functions, 'get_user_overview', slow_overview)
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=asgi.application)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(*(client.get('/api/admin/users/1/overview') for _ in range(4)))
+
+    start = time.perf_counter()
+    responses = asyncio.run(fetch())
+    elapsed = time.perf_counter() - start
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len(threads) == 4
+    assert elapsed < 0.9
@@ -0,0 +1,107 @@
+import gzip
+import json
+import multiprocessing
+from datetime import datetime, timedelta
+import csv_rotation
+from csv_rotation import append_csv_row, load_manifest, read_rows_after, read_rows_from
+
+FIELDS = ['id', 'value']
+
+def test_rotates_by_size_and_records_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_rotation, 'CSV_ROTATE_MAX_BYTES', 60)
+    for i in range(1, 21):
+        append_csv_row(str(tmp_path), 'things', FIELDS, {'id': i, 'value': f'row-{i}'})
+
+    manifest = load_manifest(str(tmp_path), 'things')
+    segments = manifest['segments']
+    assert len(segments) > 1
+    assert segments[0]['first_id'] == 1
+    assert all(a['last_id'] + 1 == b['first_id'] for a, b in zip(segments, segments[1:]))
+    assert all(a['end_offset'] == b['start_offset'] for a, b in zip(segments, segments[1:]))
+    assert manifest['active']['start_offset'] == segments[-1]['end_offset']
+
+    with gzip.open(tmp_path / segments[0]['file'], 'rt') as f:
+        assert f.readline().strip() == 'id,value'
+    assert [int(row['id']) for row in read_rows_after(str(tmp_path), 'things')] == list(range(1, 21))
+
+def test_rotates_by_age(tmp_path, monkeypatch):
+    append_csv_row(str(tmp_path), 'things', FIELDS, {'id': 1, 'value': 'a'})
+    manifest = load_manifest(str(tmp_path), 'things')
+    manifest['active']['created_at'] = (datetime.now() - timedelta(days=2)).isoformat()
+    (tmp_path / 'things.manifest.json').write_text(json.dumps(manifest))
+
+    append_csv_row(str(tmp_path), 'things', FIELDS, {'id': 2, 'value': 'b'})
+
+    manifest = load_manifest(str(tmp_path), 'things')
+    assert [(s['first_id'], s['last_id']) for s in manifest['segments']] == [(1, 1)]
+    assert (tmp_path / 'things.csv').read_text().splitlines() == ['id,value', '2,b']
+
+def test_read_rows_after_skips_old_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_rotation, 'CSV_ROTATE_MAX_BYTES', 40)
+    for i in range(1, 11):
+        append_csv_row(str(tmp_path), 'things', FIELDS, {'id': i, 'value': 'x'})
+
+    opened = []
+    real_open = gzip.open
+    monkeypatch.setattr(gzip, 'open', lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+
+    assert [int(row['id']) for row in read_rows_after(str(tmp_path), 'things', last_id=8)] == [9, 10]
+    assert len(opened) <= 1
+
+def test_read_rows_from_resumes_at_offset_across_rotations(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_rotation, 'CSV_ROTATE_MAX_BYTES', 40)
+    for i in range(1, 9):
+        append_csv_row(str(tmp_path), 'things', FIELDS, {'id': i, 'value': 'x'})
+
+    rows, offset = read_rows_from(str(tmp_path), 'things')
+    assert [int(row['id']) for row in rows] == list(range(1, 9))
+    assert read_rows_from(str(tmp_path), 'things', offset) == ([], offset)
+
+    for i in range(9, 21):
+        append_csv_row(str(tmp_path), 'things', FIELDS, {'id': i, 'value': 'y'})
+
+    opened = []
+    real_open = gzip.open
+    monkeypatch.setattr(gzip, 'open', lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+
+    rows, next_offset = read_rows_from(str(tmp_path), 'things', offset)
+    assert [int(row['id']) for row in rows] == list(range(9, 21))
+    assert all(row['value'] == 'y' for row in rows)
+    # Segments that end before the offset are never opened
+    manifest = load_manifest(str(tmp_path), 'things')
+    skipped = [s['file'] for s in manifest['segments'] if s['end_offset'] <= offset]
+    assert skipped and not {str(tmp_path / name) for name in skipped} & set(map(str, opened))
+
+    active_size = (tmp_path / 'things.csv').stat().st_size
+    assert next_offset == manifest['active']['start_offset'] + active_size
+
+def test_read_rows_from_seeks_into_active_file(tmp_path):
+    for i in range(1, 4):
+        append_csv_row(str(tmp_path), 'things', FIELDS, {'id': i, 'value': 'x'})
+    _, offset = read_rows_from(str(tmp_path), 'things')
+    append_csv_row(str(tmp_path), 'things', FIELDS, {'id': 4, 'value': 'z'})
+
+    rows, next_offset = read_rows_from(str(tmp_path), 'things', offset)
+
+    assert rows == [{'id': '4', 'value': 'z'}]
+    assert next_offset == offset + len('4,z\r\n')
+
+def append_from_process(export_dir, worker, count):
+    csv_rotation.CSV_ROTATE_MAX_BYTES = 200
+    for i in range(count):
+        append_csv_row(export_dir, 'things', FIELDS, {'id': worker * 1000 + i, 'value': 'p'})
+
+def test_appends_from_several_processes_lose_no_segments(tmp_path):
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=append_from_process, args=(str(tmp_path), w, 60)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [worker.exitcode for worker in workers] == [0] * 4
+
+    manifest = load_manifest(str(tmp_path), 'things')
+    segments = [s['segment'] for s in manifest['segments']]
+    assert len(segments) > 4 and segments == list(range(1, len(segments) + 1))
+    rows, _ = read_rows_from(str(tmp_path), 'things')
+    assert sorted(int(row['id']) for row in rows) == sorted(w * 1000 + i for w in range(4) for i in range(60))
@@ -0,0 +1,61 @@
+import json
+from datetime import date
+from models import db, User, MedicalRecord, DietPlan
+from diet_engine import RULES_PATH, engine, generate_plan, plan_for_bucket
+
+def meals_with_tag(tag):
+    index = sorted({t for meal in json.load(open(RULES_PATH))['meals'] for t in meal['tags']}).index(tag)
+    return set(engine['meal_names'][engine['tags'][:, index] > 0].tolist())
+
+def test_plan_shape_follows_bmi_band():
+    assert generate_plan(17)['snacks'][0] == 'Greek yogurt with honey'
+    assert generate_plan(22)['breakfast'][0] == 'Greek yogurt with berries and granola'
+    assert generate_plan(33)['dinner'][0] == 'Grilled fish with steamed vegetables'
+    assert [len(generate_plan(22)[slot]) for slot in ('breakfast', 'lunch', 'dinner', 'snacks')] == [3, 3, 3, 4]
+
+def test_elevated_sugar_excludes_high_sugar_meals():
+    plan = generate_plan(17, sugar=190)
+    chosen = {meal for slot in ('breakfast', 'lunch', 'dinner', 'snacks') for meal in plan[slot]}
+
+    assert not chosen & meals_with_tag('high_sugar')
+    assert len(plan['snacks']) == 4
+    assert any('blood sugar' in tip for tip in plan['tips'])
+
+def test_high_blood_pressure_excludes_high_sodium_meals():
+    plan = generate_plan(22, bp='150/95')
+    chosen = {meal for slot in ('breakfast', 'lunch', 'dinner', 'snacks') for meal in plan[slot]}
+    assert not chosen & meals_with_tag('high_sodium')
+
+def test_plans_are_memoized_per_bucket():
+    plan_for_bucket.cache_clear()
+    generate_plan(20, sugar=100, bp='120/80')
+    generate_plan(23, sugar=110, bp='118/76')
+    assert plan_for_bucket.cache_info().hits == 1
+
+def test_handler_uses_latest_medical_record(client):
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    db.session.add(MedicalRecord(user_id=1, date=date(2025, 1, 1), bp='120/80', sugar=100))
+    db.session.add(MedicalRecord(user_id=1, date=date(2025, 2, 1), bp='120/80', sugar=200))
+    db.session.commit()
+
+    plan = client.post('/api/diet-plan', json={'bmi': 17}).get_json()['dietPlan']
+
+    assert 'Greek yogurt with honey' not in plan['snacks']
+    assert DietPlan.query.count() == 1
+
+def test_get_reuses_stored_plan_until_vitals_change(client):
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    db.session.add(MedicalRecord(user_id=1, date=date(2025, 1, 1), bp='120/80', sugar=100))
+    db.session.commit()
+
+    first = client.get('/api/diet-plan?bmi=17').get_json()['dietPlan']
+    assert client.get('/api/diet-plan?bmi=17').get_json()['dietPlan'] == first
+    assert DietPlan.query.count() == 1
+    assert 'Greek yogurt with honey' in first['snacks']
+
+    db.session.add(MedicalRecord(user_id=1, date=date(2025, 2, 1), bp='120/80', sugar=200))
+    db.session.commit()
+
+    plan = client.get('/api/diet-plan?bmi=17').get_json()['dietPlan']
+    assert 'Greek yogurt with honey' not in plan['snacks']
+    assert DietPlan.query.count() == 2
@@ -0,0 +1,53 @@
+import os
+import csv
+import sqlite3
+import snapshot
+from app import db_path, export_dir
+from models import db, User, BMI
+
+def read_csv(name):
+    with open(os.path.join(export_dir, name), newline='') as f:
+        return list(csv.DictReader(f))
+
+def test_snapshot_export_reads_the_copy(client, monkeypatch):
+    db.session.add(User(name='before', email='before@example.com', password='x'))
+    db.session.commit()
+    db.session.add(BMI(user_id=1, height=170, weight=60, bmi=20.8, category='Normal Weight'))
+    db.session.commit()
+
+    copies = []
+    real_backup = snapshot.backup_database
+
+    def backup_then_write(source_path, target_path, **kwargs):
+        real_backup(source_path, target_path, **kwargs)
+        copies.append(target_path)
+        # A write that lands on the live database while the export runs
+        with sqlite3.connect(db_path) as live:
+            live.execute(
+                "INSERT INTO user (name, email, password, created_at) "
+                "VALUES ('during', 'during@example.com', 'x', '2026-01-01 00:00:00')"
+            )
+
+    monkeypatch.setattr(snapshot, 'backup_database', backup_then_write)
+
+    data = client.get('/api/admin/export-data?snapshot=true').get_json()
+
+    assert data['success'] and data['snapshot']
+    assert set(data['files']) == {'users', 'bmi_records', 'diet_plans', 'medical_records'}
+    assert all('_full_' in name for name in data['files'].values())
+    assert [row['email'] for row in read_csv(data['files']['users'])] == ['before@example.com']
+    assert len(read_csv(data['files']['bmi_records'])) == 1
+    assert User.query.count() == 2
+
+    # The temporary copy is removed once the export finishes
+    assert len(copies) == 1 and not os.path.exists(copies[0])
+
+def test_live_export_writes_every_table(client):
+    db.session.add(User(name='one', email='one@example.com', password='x'))
+    db.session.commit()
+
+    data = client.get('/api/admin/export-data').get_json()
+
+    assert data['success'] and not data['snapshot']
+    assert [row['name'] for row in read_csv(data['files']['users'])] == ['one']
+    assert read_csv(data['files']['medical_records']) == []
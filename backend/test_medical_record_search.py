@@ -0,0 +1,56 @@
+from datetime import date
+from models import db, User, MedicalRecord
+
+def add_record(user_id, day, notes):
+    record = MedicalRecord(user_id=user_id, date=date(2025, 3, day), bp='120/80', sugar=100, notes=notes)
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+def setup_users():
+    db.session.add_all([
+        User(id=1, name='one', email='one@example.com', password='x'),
+        User(id=2, name='two', email='two@example.com', password='x')
+    ])
+    db.session.commit()
+
+def test_search_ranks_and_filters(client):
+    setup_users()
+    add_record(1, 1, 'Felt dizziness after lunch')
+    add_record(1, 5, 'Dizziness again, dizziness in the morning, increased insulin')
+    add_record(2, 9, 'Routine check, no dizziness reported by patient today')
+    add_record(2, 10, 'Started insulin')
+
+    data = client.get('/api/admin/medical-records/search?q=dizziness').get_json()
+    assert data['total'] == 3
+    assert data['records'][0]['date'] == '2025-03-05'
+    assert '[Dizziness]' in data['records'][0]['snippet']
+
+    data = client.get('/api/admin/medical-records/search?q=dizziness&user_id=2').get_json()
+    assert [r['user_id'] for r in data['records']] == [2]
+
+    data = client.get('/api/admin/medical-records/search?q=insulin&from=2025-03-06').get_json()
+    assert [r['date'] for r in data['records']] == ['2025-03-10']
+
+    data = client.get('/api/admin/medical-records/search?q=dizziness&per_page=2&page=2').get_json()
+    assert data['total'] == 3 and len(data['records']) == 1
+
+def test_search_index_follows_updates_and_deletes(client):
+    setup_users()
+    record = add_record(1, 1, 'Mild headache')
+    add_record(1, 2, 'Headache resolved')
+
+    record.notes = 'Blurred vision'
+    db.session.commit()
+    assert client.get('/api/admin/medical-records/search?q=headache').get_json()['total'] == 1
+    assert client.get('/api/admin/medical-records/search?q=vision').get_json()['total'] == 1
+
+    db.session.delete(record)
+    db.session.commit()
+    assert client.get('/api/admin/medical-records/search?q=vision').get_json()['total'] == 0
+
+def test_search_rejects_bad_queries(client):
+    assert client.get('/api/admin/medical-records/search').status_code == 400
+    assert client.get('/api/admin/medical-records/search?q=%22unterminated').status_code == 400
+    for params in ('page=abc', 'per_page=1.5', 'user_id=me', 'from=2025-13-01', 'to=yesterday'):
+        assert client.get(f'/api/admin/medical-records/search?q=insulin&{params}').status_code == 400
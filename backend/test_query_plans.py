@@ -0,0 +1,83 @@
+import re
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from models import db, User, BMI, DietPlan, MedicalRecord
+
+# (endpoint, tables it may scan in full because it returns every row of them)
+HOT_ENDPOINTS = [
+    ('/api/diet-plan?bmi=21.5', set()),
+    ('/api/records', set()),
+    ('/api/admin/users', {'user'}),
+    ('/api/admin/users/with-counts', {'user'}),
+    ('/api/admin/users/1/overview', set()),
+    ('/api/admin/users/1/export', set()),
+    ('/api/admin/bmi', set()),
+    ('/api/admin/bmi?user_id=1', set()),
+    ('/api/admin/diet-plans', set()),
+    ('/api/admin/diet-plans?user_id=1', set()),
+    ('/api/admin/medical-records', set()),
+    ('/api/admin/medical-records?user_id=1', set()),
+    ('/api/admin/medical-records/search?q=routine&user_id=1', set()),
+    ('/api/admin/bmi/trends?user_id=1', set()),
+    # Every archived summary row is part of the all-users trend
+    ('/api/admin/bmi/trends', {'bmi_summary'}),
+]
+
+@pytest.fixture
+def seeded(app):
+    start = datetime(2025, 1, 1)
+    for u in range(1, 4):
+        db.session.add(User(id=u, name=f'user{u}', email=f'user{u}@example.com', password='x'))
+        for i in range(20):
+            db.session.add(BMI(user_id=u, height=170, weight=62, bmi=21.5,
+                               category='Normal Weight', timestamp=start + timedelta(days=i)))
+            db.session.add(DietPlan(user_id=u, bmi=21.5, plan=json.dumps({'tips': []}),
+                                    created_at=start + timedelta(days=i)))
+            db.session.add(MedicalRecord(user_id=u, date=date(2025, 1, 1) + timedelta(days=i),
+                                         bp='120/80', sugar=90, notes=f'routine check {i}'))
+    db.session.commit()
+    # Give the planner real statistics, as the migration does on live databases
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+def plan_problems(plan, allowed_scans):
+    tables = set(db.metadata.tables)
+    problems = []
+    for detail in plan:
+        if 'TEMP B-TREE' in detail:
+            problems.append(detail)
+        # SQLite before 3.36 reports 'SCAN TABLE x', later versions 'SCAN x'
+        match = re.match(r'SCAN (?:TABLE )?(\w+)$', detail)
+        if match and match.group(1) in tables and match.group(1) not in allowed_scans:
+            problems.append(detail)
+    return problems
+
+@pytest.mark.parametrize('endpoint,allowed_scans', HOT_ENDPOINTS)
+def test_hot_queries_use_indexes(client, seeded, query_counter, endpoint, allowed_scans):
+    query_counter.clear()
+    response = client.get(endpoint)
+    response.get_data()
+    response.close()
+    assert response.status_code == 200
+
+    selects = [(s, p) for s, p in query_counter if s.lstrip().upper().startswith('SELECT')]
+    assert selects
+    for statement, parameters in selects:
+        plan = query_plan(statement, parameters)
+        assert not plan_problems(plan, allowed_scans), f'{endpoint}\n{statement}\n{plan}'
+
+def test_migration_adds_indexes_to_existing_database(app):
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DROP INDEX ix_bmi_user_id_timestamp')
+        conn.exec_driver_sql('DROP INDEX ix_diet_plan_user_id_bmi_created_at')
+
+    from migrations import apply_migrations
+    result = apply_migrations(db.engine)
+
+    assert sorted(result['indexes']) == ['ix_bmi_user_id_timestamp', 'ix_diet_plan_user_id_bmi_created_at']
+    assert apply_migrations(db.engine)['indexes'] == []
@@ -0,0 +1,68 @@
+import threading
+import pytest
+from rate_limit import TokenBucketLimiter, MemoryBackend, RateLimitBackend, limiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_spends_and_refills():
+    clock = FakeClock()
+    bucket = TokenBucketLimiter(MemoryBackend(), capacity=10, refill_rate=2, clock=clock)
+
+    assert bucket.take('a', 6) == (True, 0.0)
+    assert bucket.take('a', 6) == (False, 1.0)
+    assert bucket.take('b', 6)[0]  # buckets are per client
+
+    clock.now = 1.0
+    assert bucket.take('a', 6) == (True, 0.0)
+
+def test_memory_backend_prunes_idle_buckets():
+    backend = MemoryBackend(max_keys=2)
+    for i, key in enumerate('abc'):
+        backend.take(key, 1, capacity=5, refill_rate=1, now=i * 10)
+    assert list(backend.buckets) == ['c']
+
+def test_backend_must_implement_take():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+def test_login_returns_429_with_retry_after(client):
+    limiter.capacity = 12
+    try:
+        statuses = [client.post('/api/auth/login', json={'email': 'x@example.com', 'password': 'x'})
+                    for _ in range(3)]
+    finally:
+        limiter.capacity = 60
+
+    assert [r.status_code for r in statuses] == [401, 401, 429]
+    assert statuses[-1].headers['Retry-After'] == '3'
+
+def test_concurrency_cap_returns_503(client, monkeypatch):
+    import app as app_module
+    started, release = threading.Event(), threading.Event()
+    real_export = app_module.export_tables
+
+    def slow_export(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return real_export(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'export_tables', slow_export)
+    first = {}
+    worker = threading.Thread(target=lambda: first.update(r=app_module.app.test_client().get('/api/admin/export-data')))
+    worker.start()
+    started.wait(5)
+
+    busy = client.get('/api/admin/export-data')
+    release.set()
+    worker.join(5)
+
+    assert busy.status_code == 503 and busy.headers['Retry-After'] == '1'
+    assert first['r'].status_code == 200
+    # Only the request that ran was charged
+    tokens, _ = limiter.backend.buckets['127.0.0.1']
+    assert 30 <= tokens < 31
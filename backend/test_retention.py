@@ -0,0 +1,142 @@
+import csv
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+import retention
+from retention import archive_table, RETENTION_POLICIES
+from models import db, User, BMI, DietPlan, BMISummary
+
+NOW = datetime(2026, 6, 15)
+
+def policy_for(table, target, batch_size=3):
+    return dict(RETENTION_POLICIES[table], target=target, batch_size=batch_size)
+
+def add_bmis(user_id, timestamps, bmi=20.0):
+    for timestamp in timestamps:
+        db.session.add(BMI(user_id=user_id, height=170, weight=60, bmi=bmi,
+                           category='Normal Weight', timestamp=timestamp))
+    db.session.commit()
+
+@pytest.fixture
+def user(app):
+    user = User(name='awais', email='awais@example.com', password='x')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def test_archive_bmi_to_database_in_batches(user, tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, 'archive_db_path', str(tmp_path / 'archive.db'))
+    old = [datetime(2024, 3, 1) + timedelta(days=i) for i in range(7)]
+    add_bmis(user, old + [NOW - timedelta(days=5)])
+
+    assert archive_table('bmi', policy_for('bmi', 'database'), NOW) == 7
+
+    assert [b.timestamp for b in BMI.query.all()] == [NOW - timedelta(days=5)]
+    with sqlite3.connect(tmp_path / 'archive.db') as archive:
+        assert archive.execute('SELECT COUNT(*) FROM bmi').fetchone()[0] == 7
+
+def test_archive_diet_plans_to_file(user, tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, 'archive_file_dir', str(tmp_path))
+    for i in range(5):
+        db.session.add(DietPlan(user_id=user, bmi=20, plan=json.dumps({'tips': []}),
+                                created_at=datetime(2025, 1, 1) + timedelta(days=i)))
+    db.session.add(DietPlan(user_id=user, bmi=20, plan='{}', created_at=NOW))
+    db.session.commit()
+
+    assert archive_table('diet_plan', policy_for('diet_plan', 'file', batch_size=2), NOW) == 5
+
+    assert DietPlan.query.count() == 1
+    files = sorted(tmp_path.glob('diet_plan_*.csv.gz'))
+    assert len(files) == 3
+    assert not list(tmp_path.glob('*.tmp'))
+    ids = []
+    for path in files:
+        with gzip.open(path, 'rt', newline='') as f:
+            ids += [int(row['id']) for row in csv.DictReader(f)]
+    assert ids == [1, 2, 3, 4, 5]
+
+def test_failed_batch_leaves_no_archive_file(user, tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, 'archive_file_dir', str(tmp_path))
+    add_bmis(user, [datetime(2024, 3, 1)])
+
+    def fail(*args):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(retention, 'summarize_batch', fail)
+
+    with pytest.raises(RuntimeError):
+        archive_table('bmi', policy_for('bmi', 'file'), NOW)
+
+    assert BMI.query.count() == 1
+    assert list(tmp_path.iterdir()) == []
+
+def test_summary_upsert_accumulates_across_batches(user, tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, 'archive_db_path', str(tmp_path / 'archive.db'))
+    add_bmis(user, [datetime(2024, 3, d) for d in (1, 2)], bmi=20.0)
+    add_bmis(user, [datetime(2024, 3, d) for d in (3, 4)], bmi=30.0)
+    add_bmis(user, [datetime(2024, 4, 1)], bmi=25.0)
+
+    archive_table('bmi', policy_for('bmi', 'database', batch_size=1), NOW)
+
+    summaries = {s.period: s for s in BMISummary.query.all()}
+    march = summaries['2024-03']
+    assert (march.count, march.bmi_sum, march.bmi_min, march.bmi_max) == (4, 100.0, 20.0, 30.0)
+    assert summaries['2024-04'].count == 1
+
+def test_trends_merge_archived_and_live_rows(client, user, tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, 'archive_db_path', str(tmp_path / 'archive.db'))
+    add_bmis(user, [datetime(2024, 3, 1)], bmi=20.0)
+    archive_table('bmi', policy_for('bmi', 'database'), NOW)
+
+    # A late-arriving live row for the archived month, plus a new month
+    add_bmis(user, [datetime(2024, 3, 20)], bmi=30.0)
+    add_bmis(user, [datetime(2026, 6, 1)], bmi=24.0)
+
+    trends = client.get(f'/api/admin/bmi/trends?user_id={user}').get_json()['trends']
+
+    assert [(t['period'], t['count'], t['avg_bmi'], t['min_bmi'], t['max_bmi']) for t in trends] == [
+        ('2024-03', 2, 25.0, 20.0, 30.0),
+        ('2026-06', 1, 24.0, 24.0, 24.0)
+    ]
+
+def test_overlapping_run_does_not_lose_rows(user, tmp_path, monkeypatch):
+    from app import db_path
+    monkeypatch.setattr(retention, 'archive_file_dir', str(tmp_path))
+    add_bmis(user, [datetime(2024, 3, 1) + timedelta(days=i) for i in range(6)])
+
+    taken_by_other_run = []
+    real_archive = retention.archive_batch_to_file
+
+    def archive_then_race(conn, table, ids):
+        result = real_archive(conn, table, ids)
+        if not taken_by_other_run:
+            # Another run commits the same batch while this one writes its file
+            with sqlite3.connect(db_path) as other:
+                other.execute(f"DELETE FROM bmi WHERE id IN ({','.join('?' * len(ids))})", ids)
+            taken_by_other_run.extend(ids)
+        return result
+
+    monkeypatch.setattr(retention, 'archive_batch_to_file', archive_then_race)
+
+    moved = archive_table('bmi', policy_for('bmi', 'file'), NOW)
+
+    archived = []
+    for path in sorted(tmp_path.glob('bmi_*.csv.gz')):
+        with gzip.open(path, 'rt', newline='') as f:
+            archived += [int(row['id']) for row in csv.DictReader(f)]
+    assert taken_by_other_run == [1, 2, 3]
+    assert sorted(archived) == [4, 5, 6] and moved == 3
+    assert not list(tmp_path.glob('*.tmp'))
+    assert BMI.query.count() == 0
+    assert sum(s.count for s in BMISummary.query.all()) == 3
+
+def test_retention_endpoint_parses_vacuum_flag(client, monkeypatch):
+    import app as app_module
+    calls = []
+    monkeypatch.setattr(app_module, 'run_retention', lambda vacuum: calls.append(vacuum) or {})
+
+    client.post('/api/admin/retention/run', json={'vacuum': 'false'})
+    client.post('/api/admin/retention/run', json={'vacuum': True})
+
+    assert calls == [False, True]
@@ -0,0 +1,83 @@
+import io
+import numpy as np
+from app import export_dir
+from csv_rotation import read_rows_after
+from models import db, User, BMI
+from screening import bmi_category, screen_cohort
+
+def test_categories_match_thresholds():
+    assert [bmi_category(b) for b in (18.4, 18.5, 24.9, 25, 29.9, 30)] == [
+        'Underweight', 'Normal Weight', 'Normal Weight', 'Overweight', 'Overweight', 'Obese'
+    ]
+
+def test_screen_large_cohort():
+    rng = np.random.default_rng(0)
+    heights = rng.uniform(140, 200, 100_000)
+    weights = rng.uniform(40, 140, 100_000)
+
+    screening = screen_cohort(heights, weights)
+
+    assert sum(screening['distribution'].values()) == 100_000
+    np.testing.assert_allclose(screening['bmi'][:3], weights[:3] / (heights[:3] / 100) ** 2)
+
+def test_screen_endpoint_csv_upload(client):
+    data = {'file': (io.BytesIO(b'height,weight\n170,50\n170,65\n170,80\n170,95\n'), 'cohort.csv')}
+    result = client.post('/api/bmi/screen', data=data, content_type='multipart/form-data').get_json()
+
+    assert [row['category'] for row in result['results']] == [
+        'Underweight', 'Normal Weight', 'Overweight', 'Obese'
+    ]
+    assert result['distribution'] == {'Underweight': 1, 'Normal Weight': 1, 'Overweight': 1, 'Obese': 1}
+    assert result['saved'] == 0
+
+def test_screen_endpoint_persists_json(client):
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    db.session.commit()
+    rows = [{'user_id': 1, 'height': 160, 'weight': 55}, {'user_id': 1, 'height': 180, 'weight': 90}]
+
+    result = client.post('/api/bmi/screen', json={'rows': rows, 'persist': True}).get_json()
+
+    assert result['saved'] == 2
+    assert sorted(b.category for b in BMI.query.all()) == ['Normal Weight', 'Overweight']
+
+    mirrored = [row for row in read_rows_after(export_dir, 'bmi_records') if row['user_id'] == '1']
+    assert [int(row['id']) for row in mirrored[-2:]] == [b.id for b in BMI.query.order_by(BMI.id)]
+    assert [row['category'] for row in mirrored[-2:]] == ['Normal Weight', 'Overweight']
+
+def test_screen_endpoint_rejects_invalid_rows(client):
+    response = client.post('/api/bmi/screen', json=[{'height': 0, 'weight': 60}])
+    assert response.status_code == 400
+    response = client.post('/api/bmi/screen', json=[{'height': 170, 'weight': 60}], query_string={'persist': 'true'})
+    assert response.status_code == 400
+
+def test_screen_endpoint_persist_flag_false_string(client):
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    db.session.commit()
+    rows = [{'user_id': 1, 'height': 160, 'weight': 55}]
+
+    result = client.post('/api/bmi/screen', json={'rows': rows, 'persist': 'false'}).get_json()
+
+    assert result['saved'] == 0
+    assert BMI.query.count() == 0
+
+def test_screen_endpoint_rejects_short_csv_rows(client):
+    for body in (b'height,weight\n170,50\n170\n', b'height,weight,user_id\n170,50,1\n170,60\n'):
+        response = client.post('/api/bmi/screen', data=body, content_type='text/csv')
+        assert response.status_code == 400
+        assert 'Line 3' in response.get_json()['error']
+
+def test_screen_endpoint_rejects_non_utf8_upload(client):
+    data = {'file': (io.BytesIO(b'height,weight\n170,\xff50\n'), 'cohort.csv')}
+    response = client.post('/api/bmi/screen', data=data, content_type='multipart/form-data')
+    assert response.status_code == 400
+
+def test_screen_endpoint_rejects_unknown_user_ids(client):
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    db.session.commit()
+    rows = [{'user_id': 1, 'height': 160, 'weight': 55}, {'user_id': 77, 'height': 180, 'weight': 90}]
+
+    response = client.post('/api/bmi/screen', json={'rows': rows, 'persist': True})
+
+    assert response.status_code == 400
+    assert '77' in response.get_json()['error']
+    assert BMI.query.count() == 0
@@ -0,0 +1,67 @@
+import io
+import csv
+import json
+import zipfile
+from datetime import date, datetime, timedelta
+from models import db, User, BMI, DietPlan, MedicalRecord
+
+def test_user_export_zip_contains_only_that_user(client):
+    db.session.add_all([
+        User(id=1, name='one', email='one@example.com', password='x'),
+        User(id=2, name='two', email='two@example.com', password='x')
+    ])
+    start = datetime(2025, 1, 1)
+    for i in range(1200):
+        db.session.add(BMI(user_id=1 + i % 2, height=170, weight=60, bmi=20.8,
+                           category='Normal Weight', timestamp=start + timedelta(minutes=i)))
+    db.session.add(DietPlan(user_id=1, bmi=20.8, plan=json.dumps({'tips': ['x']})))
+    db.session.add(MedicalRecord(user_id=1, date=date(2025, 1, 2), bp='120/80', sugar=95, notes='fine'))
+    db.session.add(MedicalRecord(user_id=2, date=date(2025, 1, 2), bp='120/80', sugar=95, notes='other'))
+    db.session.commit()
+
+    response = client.get('/api/admin/users/1/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert not response.is_sequence  # streamed, not buffered
+
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    response.close()
+    assert archive.namelist() == ['profile.json', 'bmi_records.csv', 'diet_plans.csv', 'medical_records.csv']
+    assert json.loads(archive.read('profile.json'))['email'] == 'one@example.com'
+
+    bmis = list(csv.DictReader(io.StringIO(archive.read('bmi_records.csv').decode('utf-8'))))
+    assert len(bmis) == 600 and {row['user_id'] for row in bmis} == {'1'}
+    records = list(csv.DictReader(io.StringIO(archive.read('medical_records.csv').decode('utf-8'))))
+    assert [row['notes'] for row in records] == ['fine']
+    # Same row layout as the CSV mirrors and full exports
+    assert records[0] == {k: str(v) for k, v in MedicalRecord.query.filter_by(user_id=1).one().to_csv_row().items()}
+
+def test_user_export_missing_user(client):
+    assert client.get('/api/admin/users/42/export').status_code == 404
+
+def test_paused_export_does_not_block_writers(client, monkeypatch):
+    import sqlite3
+    import user_export
+    from app import db_path
+    monkeypatch.setattr(user_export, 'EXPORT_BATCH_ROWS', 50)
+    db.session.add(User(id=1, name='one', email='one@example.com', password='x'))
+    start = datetime(2025, 1, 1)
+    for i in range(600):
+        # Pairs of equal timestamps exercise the id tiebreak between batches
+        db.session.add(BMI(user_id=1, height=170, weight=60, bmi=20.8,
+                           category='Normal Weight', timestamp=start + timedelta(minutes=i // 2)))
+    db.session.commit()
+
+    response = client.get('/api/admin/users/1/export')
+    chunks = iter(response.response)
+    body = [next(chunks) for _ in range(3)]
+
+    # The client has stalled mid-table; another connection must still be able to write
+    with sqlite3.connect(db_path, timeout=0.1) as other:
+        other.execute("INSERT INTO user (name, email, password) VALUES ('two', 'two@example.com', 'x')")
+
+    body += list(chunks)
+    response.close()
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(body)))
+    ids = [int(row['id']) for row in csv.DictReader(io.StringIO(archive.read('bmi_records.csv').decode('utf-8')))]
+    assert ids == list(range(1, 601))
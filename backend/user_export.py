@@ -0,0 +1,93 @@
+import io
+import csv
+import json
+import zipfile
+from sqlalchemy import literal, tuple_
+from models import BMI, DietPlan, MedicalRecord
+
+# Rows fetched from the database per batch, and rows written between flushes
+EXPORT_BATCH_ROWS = 500
+
+class ZipStream:
+    """Write-only, non-seekable file object that collects zip output.
+
+    zipfile falls back to data descriptors when the target cannot seek, so
+    each entry can be written front to back and drained as it is produced.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+def user_export_sections():
+    """(file name, model, ordering column) for each per-user table"""
+    return [
+        ('bmi_records.csv', BMI, BMI.timestamp),
+        ('diet_plans.csv', DietPlan, DietPlan.created_at),
+        ('medical_records.csv', MedicalRecord, MedicalRecord.date)
+    ]
+
+def iter_batches(model, user_id, order_column):
+    """Yield one user's rows of a table in batches, one short query each.
+
+    Keyset pagination on (order_column, id) means no cursor is left open
+    while the export waits on a slow client, so writers are never blocked.
+    """
+    last = None
+    while True:
+        query = model.query.filter_by(user_id=user_id)
+        if last is not None:
+            last_value, last_id = last
+            query = query.filter(
+                tuple_(order_column, model.id) > tuple_(literal(last_value, order_column.type), literal(last_id))
+            )
+        batch = query.order_by(order_column, model.id).limit(EXPORT_BATCH_ROWS).all()
+        if batch:
+            yield batch
+        if len(batch) < EXPORT_BATCH_ROWS:
+            return
+        last = (getattr(batch[-1], order_column.key), batch[-1].id)
+
+def iter_user_export(user):
+    """Yield a zip archive of one user's data chunk by chunk.
+
+    Each table is read in batches through its per-user index and written
+    straight into the archive, so memory use does not grow with history size.
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('profile.json', json.dumps(user.to_dict(), indent=2))
+        yield stream.drain()
+
+        for filename, model, order_column in user_export_sections():
+            with archive.open(filename, 'w') as entry:
+                text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+                writer = csv.DictWriter(text, fieldnames=model.csv_fieldnames)
+                writer.writeheader()
+
+                for batch in iter_batches(model, user.id, order_column):
+                    writer.writerows(record.to_csv_row() for record in batch)
+                    text.flush()
+                    yield stream.drain()
+
+                text.flush()
+                text.detach()
+            yield stream.drain()
+
+    yield stream.drain()